@@ -1,26 +1,42 @@
 # backend/app/auth/auth_handler.py
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
 import secrets
+from .password_hasher import password_hasher
+from ..services.metrics import span
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("JWT_ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_EXPIRE_DAYS", 7))
 BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
 
+@lru_cache(maxsize=None)
+def _pwd_context():
+    # passlib and its bcrypt backend are loaded on first use, not at import
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password, rounds=BCRYPT_ROUNDS)
+    return _pwd_context().hash(password, rounds=BCRYPT_ROUNDS)
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password on the hashing pool instead of the event loop"""
+    with span("hash"):
+        return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Hash a password on the hashing pool instead of the event loop"""
+    with span("hash"):
+        return await password_hasher.run(get_password_hash, password)
 
 def validate_password_strength(password: str) -> tuple[bool, str]:
     """Validate password strength"""
@@ -41,14 +57,14 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": secrets.token_urlsafe(16)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_urlsafe(16)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -0,0 +1,120 @@
+# backend/app/auth/password_hasher.py
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import os
+import time
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" or "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64))
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full and the request should be shed"""
+    pass
+
+
+def _timed_call(fn, submitted_at: float, *args):
+    # Runs inside the worker; time.monotonic is system-wide on Linux so the
+    # timestamps are comparable even when the worker is another process.
+    started_at = time.monotonic()
+    result = fn(*args)
+    return result, started_at - submitted_at, time.monotonic() - started_at
+
+
+class _TimingStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "avg_seconds": self.total / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+        }
+
+
+class PasswordHashExecutor:
+    """Bounded worker pool for bcrypt so hashing never runs on the event loop.
+
+    At most ``max_workers`` hashes run at once and at most ``max_queue`` more
+    may wait for a worker; anything beyond that is rejected immediately with
+    ``PasswordHasherBusy`` instead of piling up behind a login burst.
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS,
+                 max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+                 kind: str = PASSWORD_HASH_EXECUTOR):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.kind = kind
+        self._executor: Executor = None
+        self._in_flight = 0
+        self.rejected = 0
+        self.queue_wait = _TimingStats()
+        self.hash_time = _TimingStats()
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so every server worker process owns its own pool
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pwhash"
+                )
+            logger.info(f"Password hashing pool started ({self.kind}, {self.max_workers} workers)")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, waited, took = await loop.run_in_executor(
+                self._get_executor(), _timed_call, fn, time.monotonic(), *args
+            )
+        finally:
+            self._in_flight -= 1
+
+        self.queue_wait.observe(waited)
+        self.hash_time.observe(took)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.max_workers),
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.as_dict(),
+            "hash_time": self.hash_time.as_dict(),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHashExecutor()
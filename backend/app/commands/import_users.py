@@ -0,0 +1,171 @@
+# backend/app/commands/import_users.py
+"""Bulk-import users from a CSV or NDJSON file.
+
+Rows need ``username``, ``email``, ``full_name``, ``user_class`` and
+``password``. The file is streamed in batches: each row is validated like
+a registration, passwords are hashed across a process pool, and the batch
+is written with ``insert_many(ordered=False)`` so one bad row never blocks
+the rest. Duplicates, against existing users or earlier rows of the file,
+are rejected by the unique email and username indexes. Every rejected row
+is written to the NDJSON error report with its line number.
+
+    python -m app.commands.import_users partners.csv --report import-errors.ndjson [--workers 8]
+
+Imported users show up on leaderboards after the next reconciliation.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Tuple
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from ..models.user import UserCreate
+from ..auth.auth_handler import get_password_hash, validate_password_strength
+from ..services.database import connect_to_mongo, close_mongo_connection, get_database, mongodb
+from ..services.user_service import new_user_document, DUPLICATE_USER_MESSAGES
+
+DUPLICATE_KEY = 11000
+
+
+def read_rows(path: str, fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Yield ``(line_number, row)`` without loading the file"""
+    with open(path, newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                if None in row:
+                    # DictReader files fields beyond the header under the key None
+                    row = {"email": row.get("email"),
+                           "_error": f"Row has {len(reader.fieldnames) + len(row[None])} fields, "
+                                     f"the header has {len(reader.fieldnames)}"}
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        row = {"_error": f"Invalid JSON: {e.msg}"}
+                    if not isinstance(row, dict):
+                        row = {"_error": f"Expected a JSON object, got {type(row).__name__}"}
+                    yield line_number, row
+
+
+def validate(row: dict) -> UserCreate:
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    try:
+        user = UserCreate(**row)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    except TypeError as e:
+        raise ValueError(f"Malformed row: {e}")
+    is_valid, message = validate_password_strength(user.password)
+    if not is_valid:
+        raise ValueError(message)
+    return user
+
+
+class Importer:
+    def __init__(self, executor: ProcessPoolExecutor, report):
+        self.executor = executor
+        self.report = report
+        self.read = 0
+        self.inserted = 0
+        self.failed = 0
+
+    def reject(self, line_number: int, row: dict, error: str):
+        self.failed += 1
+        self.report.write(json.dumps({"line": line_number, "email": row.get("email"), "error": error}) + "\n")
+
+    async def import_batch(self, batch: list):
+        users = []
+        for line_number, row in batch:
+            try:
+                users.append((line_number, row, validate(row)))
+            except ValueError as e:
+                self.reject(line_number, row, str(e))
+        if not users:
+            return
+
+        loop = asyncio.get_running_loop()
+        hashes = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, get_password_hash, user.password) for _, _, user in users
+        ))
+        documents = [
+            new_user_document(user.model_dump(exclude={"password"}), hashed)
+            for (_, _, user), hashed in zip(users, hashes)
+        ]
+
+        failed = {}
+        try:
+            await get_database().users.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY:
+                    field = next(iter(error.get("keyPattern") or {}), "email")
+                    failed[error["index"]] = DUPLICATE_USER_MESSAGES.get(field, error.get("errmsg"))
+                else:
+                    failed[error["index"]] = error.get("errmsg", "Insert failed")
+
+        for index, (line_number, row, _) in enumerate(users):
+            if index in failed:
+                self.reject(line_number, row, failed[index])
+        self.inserted += len(users) - len(failed)
+
+
+async def import_users(path: str, fmt: str, batch_size: int, workers: int, report_path: str):
+    await connect_to_mongo()
+    if mongodb.index_drift:
+        await close_mongo_connection()
+        # Duplicates are only rejected by the unique indexes
+        raise SystemExit("❌ User indexes differ from spec, refusing to import: "
+                         + "; ".join(mongodb.index_drift))
+    started = time.perf_counter()
+    report = open(report_path, "w") if report_path else sys.stderr
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            importer = Importer(executor, report)
+            batch = []
+            for line_number, row in read_rows(path, fmt):
+                importer.read += 1
+                batch.append((line_number, row))
+                if len(batch) >= batch_size:
+                    await importer.import_batch(batch)
+                    batch = []
+                    print(f"  👥 {importer.read} rows read, {importer.inserted} imported, {importer.failed} rejected")
+            if batch:
+                await importer.import_batch(batch)
+
+        elapsed = time.perf_counter() - started
+        print(f"🏁 {importer.inserted} of {importer.read} users imported in {elapsed:.1f}s "
+              f"({importer.read / elapsed if elapsed else 0:.0f} rows/s)")
+        if importer.failed:
+            print(f"⚠️  {importer.failed} rows rejected, see {report_path or 'stderr'}")
+    finally:
+        if report_path:
+            report.close()
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="CSV (with a header row) or NDJSON file")
+    parser.add_argument("--format", choices=("csv", "ndjson"),
+                        help="defaults to the file extension (.csv, otherwise NDJSON)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="password hashing processes")
+    parser.add_argument("--report", help="write rejected rows here as NDJSON (default: stderr)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    asyncio.run(import_users(args.path, fmt, args.batch_size, args.workers, args.report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# backend/app/commands/migrate_unique_usernames.py
+"""Make ``users.username_1`` unique on deployments that predate it.
+
+Databases created before usernames had to be unique carry a plain
+``username_1`` index, which ``reconcile_indexes`` leaves alone (and the
+API reports as not ready). This finds usernames held by more than one
+user and reports them; duplicates have to be renamed by hand, so with any
+left the index is not touched. Otherwise the old index is dropped and
+rebuilt as unique.
+
+    python -m app.commands.migrate_unique_usernames [--dry-run] [--report duplicates.ndjson]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from ..services.database import connect_to_mongo, close_mongo_connection, get_database, check_indexes
+
+USERNAME_KEY = [("username", 1)]
+
+
+async def find_duplicates(db) -> list:
+    """``[{"username", "count", "ids"}]`` for usernames shared by several users"""
+    rows = await db.users.aggregate([
+        {"$group": {"_id": "$username", "count": {"$sum": 1}, "ids": {"$push": "$_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+    ], allowDiskUse=True).to_list(None)
+    return [{"username": r["_id"], "count": r["count"], "ids": [str(i) for i in r["ids"]]} for r in rows]
+
+
+async def username_index(db):
+    async for index in db.users.list_indexes():
+        if list(index["key"].items()) == USERNAME_KEY:
+            return index
+    return None
+
+
+async def migrate(dry_run: bool, report_path: str) -> int:
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        index = await username_index(db)
+        if index is not None and index.get("unique"):
+            print(f"✅ {index['name']} is already unique")
+            return 0
+
+        duplicates = await find_duplicates(db)
+        if duplicates:
+            report = open(report_path, "w") if report_path else sys.stderr
+            for row in duplicates:
+                report.write(json.dumps(row) + "\n")
+            if report_path:
+                report.close()
+            print(f"❌ {len(duplicates)} usernames are held by more than one user "
+                  f"(see {report_path or 'stderr'}); rename them, then run this again")
+            return 1
+
+        if dry_run:
+            print(f"🔍 No duplicate usernames; would rebuild {index['name'] if index else 'username_1'} as unique")
+            return 0
+        if index is not None:
+            print(f"🧹 Dropping {index['name']}")
+            await db.users.drop_index(index["name"])
+        # A username inserted in between fails the build; running this again is safe
+        await db.users.create_index(USERNAME_KEY, unique=True)
+        print("🔒 users.username_1 rebuilt as unique")
+        return 1 if await check_indexes() else 0
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="only report duplicates")
+    parser.add_argument("--report", help="write duplicate usernames here as NDJSON (default: stderr)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(migrate(args.dry_run, args.report)))
+
+
+if __name__ == "__main__":
+    main()
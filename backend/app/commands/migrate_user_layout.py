@@ -0,0 +1,151 @@
+# backend/app/commands/migrate_user_layout.py
+"""Move embedded per-user arrays out of the ``users`` collection.
+
+``inventory``, ``active_quests``, ``completed_quests`` and ``exercise_logs``
+used to live inside each user document. This moves them to
+``user_inventory``, ``user_quests`` and ``exercise_logs`` in batches while
+the API keeps serving traffic. Progress is checkpointed after every batch,
+and every write is an upsert keyed deterministically, so an interrupted run
+can simply be started again.
+
+    python -m app.commands.migrate_user_layout --batch-size 500
+"""
+from datetime import datetime
+from pymongo import ReplaceOne, UpdateOne
+from bson import ObjectId
+import argparse
+import asyncio
+from ..services.database import connect_to_mongo, close_mongo_connection, get_database
+
+MIGRATION_ID = "user_layout_v2"
+ARRAY_FIELDS = ("inventory", "active_quests", "completed_quests", "exercise_logs")
+
+
+def _inventory_ops(user_id: str, inventory: list) -> list:
+    ops = []
+    for index, entry in enumerate(inventory):
+        doc = dict(entry) if isinstance(entry, dict) else {"item_id": entry}
+        doc.pop("_id", None)
+        doc["item_id"] = str(doc.pop("id", doc.get("item_id")))
+        doc.setdefault("equipped", False)
+        doc["user_id"] = user_id
+        doc["_id"] = f"{user_id}:inventory:{index}"
+        ops.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+    return ops
+
+
+def _quest_ops(user_id: str, quests: list, status: str) -> list:
+    ops = []
+    for entry in quests:
+        doc = dict(entry) if isinstance(entry, dict) else {"quest_id": entry}
+        doc.pop("_id", None)
+        quest_id = str(doc.pop("id", doc.get("quest_id")))
+        # Part of the unique key; embedded entries predating repeatable quests have none
+        period = doc.get("period")
+        doc.update({"user_id": user_id, "quest_id": quest_id, "period": period, "status": status})
+        ops.append(UpdateOne(
+            {"user_id": user_id, "quest_id": quest_id, "period": period},
+            # A completed entry wins over an active one for the same quest
+            {"$set": doc} if status == "completed" else {"$setOnInsert": doc},
+            upsert=True
+        ))
+    return ops
+
+
+def _exercise_log_ops(user_id: str, logs: list) -> list:
+    ops = []
+    for index, entry in enumerate(logs):
+        doc = dict(entry)
+        log_id = doc.pop("id", None) or doc.get("_id")
+        if isinstance(log_id, str) and ObjectId.is_valid(log_id):
+            log_id = ObjectId(log_id)
+        doc["_id"] = log_id or f"{user_id}:log:{index}"
+        doc["user_id"] = user_id
+        ops.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+    return ops
+
+
+async def migrate_batch(db, after_id, batch_size: int):
+    query = {"$or": [{field: {"$exists": True}} for field in ARRAY_FIELDS]}
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+
+    users = await db.users.find(
+        query, {field: 1 for field in ARRAY_FIELDS}
+    ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+
+    inventory_ops, quest_ops, log_ops, user_ops = [], [], [], []
+    for user in users:
+        user_id = str(user["_id"])
+        inventory_ops += _inventory_ops(user_id, user.get("inventory") or [])
+        quest_ops += _quest_ops(user_id, user.get("active_quests") or [], "active")
+        quest_ops += _quest_ops(user_id, user.get("completed_quests") or [], "completed")
+        log_ops += _exercise_log_ops(user_id, user.get("exercise_logs") or [])
+        user_ops.append(UpdateOne(
+            {"_id": user["_id"]},
+            {"$unset": {field: "" for field in ARRAY_FIELDS}}
+        ))
+
+    # Copy first, unset last: a crash in between only repeats idempotent upserts
+    if inventory_ops:
+        await db.user_inventory.bulk_write(inventory_ops, ordered=False)
+    if quest_ops:
+        await db.user_quests.bulk_write(quest_ops, ordered=False)
+    if log_ops:
+        await db.exercise_logs.bulk_write(log_ops, ordered=False)
+    if user_ops:
+        await db.users.bulk_write(user_ops, ordered=False)
+
+    return (users[-1]["_id"] if users else None), len(users)
+
+
+async def migrate(batch_size: int, reset: bool, max_batches: int = None):
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        if reset:
+            await db.migrations.delete_one({"_id": MIGRATION_ID})
+
+        state = await db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+        after_id = state.get("last_id")
+        migrated = state.get("migrated", 0)
+        batches = 0
+        print(f"🚚 Migrating user layout from {after_id or 'the beginning'}")
+
+        while max_batches is None or batches < max_batches:
+            last_id, count = await migrate_batch(db, after_id, batch_size)
+            if not count:
+                break
+            after_id = last_id
+            migrated += count
+            batches += 1
+            await db.migrations.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {"last_id": after_id, "migrated": migrated, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            print(f"  ✅ {migrated} users migrated (last id {after_id})")
+
+        if max_batches is None or batches < max_batches:
+            await db.migrations.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {"completed_at": datetime.utcnow()}},
+                upsert=True
+            )
+            print(f"🏁 Migration complete: {migrated} users")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-batches", type=int, default=None,
+                        help="stop after this many batches (resume later)")
+    parser.add_argument("--reset", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.reset, args.max_batches))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# backend/app/commands/rebuild_rollups.py
+"""Rebuild ``exercise_rollups`` from raw exercise logs.
+
+The log history is split into windows aligned to week boundaries, so
+every daily and weekly bucket falls inside exactly one window. Windows are
+aggregated concurrently (``--workers``) with the same ``rollup_increments``
+the ingestion path uses, summed per cursor batch so only the window's
+buckets are held in memory, and each finished bucket replaces its rollup
+document. Buckets still receiving new logs while this runs may lose those
+increments; run it when ingestion is quiet or rebuild the last week again.
+
+    python -m app.commands.rebuild_rollups --workers 4 --window-weeks 4 [--reset]
+"""
+from collections import defaultdict
+from datetime import timedelta
+from pymongo import ReplaceOne
+import argparse
+import asyncio
+import time
+from ..services.database import connect_to_mongo, close_mongo_connection, get_database
+from ..services.exercise_catalog import ExerciseCatalog
+from ..services.analytics import bucket_start, rollup_id, rollup_increments
+
+LOG_PROJECTION = {
+    "user_id": 1, "exercise_id": 1, "exercise_type": 1, "completed_at": 1,
+    "experience_gained": 1, "reps": 1, "sets": 1, "duration_minutes": 1
+}
+
+
+def rollup_document(user_id, period, start, fields: dict) -> dict:
+    doc = {"_id": rollup_id(user_id, period, start), "user_id": user_id, "period": period, "start": start}
+    for path, amount in fields.items():
+        target = doc
+        *parents, leaf = path.split(".")
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = amount
+    return doc
+
+
+def merge_increments(totals: dict, increments: dict):
+    for key, fields in increments.items():
+        target = totals[key]
+        for field, amount in fields.items():
+            target[field] += amount
+
+
+async def rebuild_window(db, catalog: ExerciseCatalog, start, end, batch_size: int) -> tuple[int, int, int]:
+    """Aggregate logs in ``[start, end)``; returns (logs, skipped, buckets)"""
+    # Summed one cursor batch at a time, so memory grows with buckets, not logs
+    increments = defaultdict(lambda: defaultdict(int))
+    count, skipped, batch = 0, 0, []
+    cursor = db.exercise_logs.find(
+        {"completed_at": {"$gte": start, "$lt": end}}, LOG_PROJECTION, batch_size=batch_size
+    )
+    async for log in cursor:
+        if not log.get("exercise_type"):
+            exercise = catalog.get(log.get("exercise_id"))
+            if exercise is None:
+                skipped += 1
+                continue
+            log["exercise_type"] = exercise["exercise_type"]
+        batch.append(log)
+        if len(batch) >= batch_size:
+            merge_increments(increments, rollup_increments(batch))
+            count += len(batch)
+            batch = []
+    merge_increments(increments, rollup_increments(batch))
+    count += len(batch)
+
+    ops = [
+        ReplaceOne({"_id": rollup_id(*key)}, rollup_document(*key, fields), upsert=True)
+        for key, fields in increments.items()
+    ]
+    for i in range(0, len(ops), batch_size):
+        await db.exercise_rollups.bulk_write(ops[i:i + batch_size], ordered=False)
+    return count, skipped, len(ops)
+
+
+async def rebuild(workers: int, window_weeks: int, batch_size: int, reset: bool):
+    await connect_to_mongo()
+    db = get_database()
+    started = time.perf_counter()
+    try:
+        first = await db.exercise_logs.find_one({}, {"completed_at": 1}, sort=[("completed_at", 1)])
+        last = await db.exercise_logs.find_one({}, {"completed_at": 1}, sort=[("completed_at", -1)])
+        if not first:
+            print("📭 No exercise logs to roll up")
+            return
+
+        catalog = ExerciseCatalog(reload_mode="off")
+        await catalog.reload()
+        if reset:
+            await db.exercise_rollups.delete_many({})
+
+        step = timedelta(weeks=window_weeks)
+        windows = []
+        start = bucket_start(first["completed_at"], "week")
+        while start <= last["completed_at"]:
+            windows.append((start, start + step))
+            start += step
+        print(f"🧱 Rebuilding rollups for {first['completed_at']:%Y-%m-%d}..{last['completed_at']:%Y-%m-%d} "
+              f"in {len(windows)} windows with {workers} workers")
+
+        semaphore = asyncio.Semaphore(workers)
+        totals = [0, 0, 0]
+
+        async def run(window):
+            async with semaphore:
+                result = await rebuild_window(db, catalog, *window, batch_size)
+            for i, value in enumerate(result):
+                totals[i] += value
+            print(f"  ✅ {window[0]:%Y-%m-%d}: {result[0]} logs, {result[2]} buckets")
+
+        await asyncio.gather(*(run(window) for window in windows))
+        print(f"🏁 {totals[0]} logs rolled up into {totals[2]} buckets "
+              f"({totals[1]} skipped without a known exercise) in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="windows aggregated concurrently")
+    parser.add_argument("--window-weeks", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true", help="delete all rollups first")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.workers, args.window_weeks, args.batch_size, args.reset))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# backend/app/commands/recompute_energy.py
+"""Recompute regenerated energy for every user in vectorized chunks.
+
+The API computes energy lazily, so this is only needed for admin fixes and
+analytics snapshots. Users are streamed in chunks and regenerated with
+NumPy. With ``--apply``, changed balances are written back in one
+``bulk_write`` per chunk; each write is guarded on the regen clock it was
+computed from, so a concurrent spend is never overwritten.
+
+    python -m app.commands.recompute_energy --chunk-size 10000 [--apply]
+"""
+from datetime import datetime
+from pymongo import UpdateOne
+import argparse
+import asyncio
+import numpy as np
+from ..services.database import connect_to_mongo, close_mongo_connection, get_database
+from ..services.energy import ENERGY_REGEN_INTERVAL_SECONDS, ENERGY_REGEN_AMOUNT, DEFAULT_MAX_ENERGY
+
+ENERGY_PROJECTION = {"energy": 1, "max_energy": 1, "last_energy_update": 1}
+
+
+def regenerate_batch(energy: np.ndarray, max_energy: np.ndarray, last_ms: np.ndarray,
+                     now_ms: int) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``services.energy.regenerate`` over millisecond timestamps"""
+    interval_ms = ENERGY_REGEN_INTERVAL_SECONDS * 1000
+    ticks = np.maximum((now_ms - last_ms) // interval_ms, 0)
+    current = np.minimum(energy + ticks * ENERGY_REGEN_AMOUNT, max_energy)
+    full = current >= max_energy
+    clock = np.where(full, now_ms, last_ms + ticks * interval_ms)
+    return current, clock
+
+
+def _columns(users: list, now_ms: int):
+    energy = np.fromiter((u.get("energy", DEFAULT_MAX_ENERGY) for u in users), np.int64, len(users))
+    max_energy = np.fromiter((u.get("max_energy", DEFAULT_MAX_ENERGY) for u in users), np.int64, len(users))
+    last = np.array(
+        [u.get("last_energy_update") or np.datetime64("NaT") for u in users], dtype="datetime64[ms]"
+    )
+    missing = np.isnat(last)
+    last_ms = np.where(missing, now_ms, last.astype(np.int64))
+    return energy, max_energy, last_ms
+
+
+async def recompute(chunk_size: int, apply: bool):
+    await connect_to_mongo()
+    db = get_database()
+    now = datetime.utcnow()
+    now_ms = int(np.datetime64(now, "ms").astype(np.int64))
+    scanned = changed = full = 0
+    energy_sum = 0
+
+    try:
+        cursor = db.users.find({}, ENERGY_PROJECTION, batch_size=chunk_size)
+        while True:
+            users = await cursor.to_list(chunk_size)
+            if not users:
+                break
+
+            energy, max_energy, last_ms = _columns(users, now_ms)
+            current, clock = regenerate_batch(energy, max_energy, last_ms, now_ms)
+            dirty = np.flatnonzero(current != energy)
+
+            scanned += len(users)
+            changed += len(dirty)
+            full += int(np.count_nonzero(current >= max_energy))
+            energy_sum += int(current.sum())
+
+            if apply and len(dirty):
+                ops = [
+                    UpdateOne(
+                        {"_id": users[i]["_id"], "last_energy_update": users[i].get("last_energy_update")},
+                        {"$set": {
+                            "energy": int(current[i]),
+                            "last_energy_update": np.datetime64(int(clock[i]), "ms").astype(datetime),
+                        }}
+                    )
+                    for i in dirty
+                ]
+                await db.users.bulk_write(ops, ordered=False)
+
+            print(f"  ⚡ {scanned} users scanned, {changed} regenerated")
+
+        mean = energy_sum / scanned if scanned else 0
+        print(f"🏁 {scanned} users: {changed} {'updated' if apply else 'would change'}, "
+              f"{full} at max energy, mean energy {mean:.1f}")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--apply", action="store_true", help="write regenerated balances back")
+    args = parser.parse_args()
+    asyncio.run(recompute(args.chunk_size, args.apply))
+
+
+if __name__ == "__main__":
+    main()
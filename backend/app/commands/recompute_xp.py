@@ -0,0 +1,222 @@
+# backend/app/commands/recompute_xp.py
+"""Recompute every user's experience and attributes from their exercise logs.
+
+Run this after retuning the reward formula. Exercise logs are streamed in
+chunks, turned into NumPy columns and rewarded with the vectorized engine
+in ``services.xp_engine``, then reduced to one total per user. Quest
+experience (``user_quests.rewards_granted.exp``) is added on top, since it
+does not come from a log. Logs whose exercise is no longer in the catalog
+cannot be recomputed; their stored rewards are left as they are and
+counted into the user totals unchanged.
+
+The default is a dry run that reports how many logs and users would change
+and prints a sample of the differences. With ``--apply``, changed logs and
+users are written with one ``bulk_write`` per chunk. Each user update is
+guarded on the level and experience it was compared against, so a user
+who gains stats mid-run is skipped rather than overwritten.
+
+    python -m app.commands.recompute_xp --chunk-size 50000 [--apply] [--show 20]
+"""
+from collections import defaultdict
+from typing import Dict
+from pymongo import UpdateOne
+import argparse
+import asyncio
+import time
+import numpy as np
+from ..services.database import connect_to_mongo, close_mongo_connection, get_database
+from ..services.exercise_catalog import ExerciseCatalog
+from ..services.user_service import CLASS_BONUSES
+from ..services.xp_engine import (
+    ATTRIBUTES, ATTRIBUTE_CODES, rewards_batch, levels_for_totals, group_by_user
+)
+
+LOG_PROJECTION = {
+    "user_id": 1, "exercise_id": 1, "sets": 1, "reps": 1, "duration_minutes": 1,
+    "weight_kg": 1, "experience_gained": 1, "attributes_gained": 1
+}
+USER_PROJECTION = {"username": 1, "user_class": 1, "level": 1, "experience": 1, "attributes": 1}
+
+
+def _column(logs: list, key: str, dtype) -> np.ndarray:
+    return np.fromiter((log.get(key) or 0 for log in logs), dtype, len(logs))
+
+
+class Accumulator:
+    """Running per-user totals across chunks"""
+
+    def __init__(self):
+        self.experience: Dict[str, int] = defaultdict(int)
+        self.attributes: Dict[str, np.ndarray] = {}
+
+    def add(self, users, experience, matrix):
+        for user_id, exp, row in zip(users, experience, matrix):
+            self.experience[user_id] += int(exp)
+            if user_id in self.attributes:
+                self.attributes[user_id] += row
+            else:
+                self.attributes[user_id] = row.copy()
+
+    def add_stored(self, log: dict):
+        """Count a log's stored rewards as they are"""
+        user_id = log["user_id"]
+        self.experience[user_id] += int(log.get("experience_gained") or 0)
+        row = self.attributes.setdefault(user_id, np.zeros(len(ATTRIBUTES), dtype=np.int64))
+        for name, value in (log.get("attributes_gained") or {}).items():
+            if name in ATTRIBUTE_CODES:
+                row[ATTRIBUTE_CODES[name]] += int(value or 0)
+
+
+async def recompute_logs(db, catalog: ExerciseCatalog, chunk_size: int, apply: bool,
+                         totals: Accumulator) -> dict:
+    definitions = {exercise["id"]: exercise for exercise in catalog.all()}
+    exercise_ids = sorted(definitions)
+    exercise_codes = {exercise_id: code for code, exercise_id in enumerate(exercise_ids)}
+    # Unknown exercises map to code -1, i.e. the trailing zero-reward entry
+    base_exp = np.array([definitions[e]["base_exp"] for e in exercise_ids] + [0], dtype=np.float64)
+    type_codes = np.array(
+        [ATTRIBUTE_CODES[definitions[e]["exercise_type"]] for e in exercise_ids] + [0], dtype=np.int64
+    )
+
+    counts = {"logs": 0, "unknown_exercise": 0, "logs_changed": 0}
+    cursor = db.exercise_logs.find({}, LOG_PROJECTION, batch_size=chunk_size)
+    while True:
+        logs = await cursor.to_list(chunk_size)
+        if not logs:
+            break
+
+        codes = np.fromiter(
+            (exercise_codes.get(log.get("exercise_id"), -1) for log in logs), np.int64, len(logs)
+        )
+        known = codes >= 0
+        experience, gains = rewards_batch(
+            base_exp[codes], _column(logs, "sets", np.int64), _column(logs, "reps", np.int64),
+            _column(logs, "duration_minutes", np.int64), _column(logs, "weight_kg", np.float64)
+        )
+        attribute_codes = type_codes[codes]
+
+        index = np.flatnonzero(known)
+        users, user_exp, matrix = group_by_user(
+            [logs[i]["user_id"] for i in index], experience[index], attribute_codes[index], gains[index]
+        )
+        totals.add(users, user_exp, matrix)
+        for i in np.flatnonzero(~known):
+            totals.add_stored(logs[i])
+
+        stored = _column(logs, "experience_gained", np.int64)
+        changed = [
+            i for i in index
+            if stored[i] != experience[i]
+            or (logs[i].get("attributes_gained") or {}) != {ATTRIBUTES[attribute_codes[i]]: int(gains[i])}
+        ]
+        counts["logs"] += len(logs)
+        counts["unknown_exercise"] += int(np.count_nonzero(~known))
+        counts["logs_changed"] += len(changed)
+
+        if apply and changed:
+            await db.exercise_logs.bulk_write([
+                UpdateOne({"_id": logs[i]["_id"]}, {"$set": {
+                    "experience_gained": int(experience[i]),
+                    "attributes_gained": {ATTRIBUTES[attribute_codes[i]]: int(gains[i])},
+                }})
+                for i in changed
+            ], ordered=False)
+
+        print(f"  📜 {counts['logs']} logs scanned, {counts['logs_changed']} with new rewards")
+    return counts
+
+
+async def add_quest_experience(db, totals: Accumulator):
+    async for quest in db.user_quests.find(
+        {"status": "completed", "rewards_granted.exp": {"$gt": 0}}, {"user_id": 1, "rewards_granted": 1}
+    ):
+        totals.experience[quest["user_id"]] += quest["rewards_granted"]["exp"]
+
+
+async def apply_users(db, totals: Accumulator, chunk_size: int, apply: bool, show: int) -> dict:
+    counts = {"users": 0, "users_changed": 0, "skipped_concurrent": 0}
+    cursor = db.users.find({}, USER_PROJECTION, batch_size=chunk_size)
+    zero = np.zeros(len(ATTRIBUTES), dtype=np.int64)
+    while True:
+        users = await cursor.to_list(chunk_size)
+        if not users:
+            break
+
+        ids = [str(user["_id"]) for user in users]
+        exp_totals = np.fromiter((totals.experience.get(uid, 0) for uid in ids), np.int64, len(ids))
+        levels, experience = levels_for_totals(exp_totals)
+
+        ops = []
+        for i, user in enumerate(users):
+            gained = totals.attributes.get(ids[i], zero)
+            # Rebuilt on top of the class starting attributes, like registration
+            base = CLASS_BONUSES.get(user.get("user_class"), CLASS_BONUSES["warrior"])
+            attributes = {name: base[name] + int(gained[code]) for code, name in enumerate(ATTRIBUTES)}
+            current = user.get("attributes") or {}
+            before = (user.get("level", 1), user.get("experience", 0),
+                      {name: current.get(name, base[name]) for name in ATTRIBUTES})
+            after = (int(levels[i]), int(experience[i]), attributes)
+            if before == after:
+                continue
+
+            counts["users_changed"] += 1
+            if counts["users_changed"] <= show:
+                print(f"    {user.get('username', ids[i])}: level {before[0]} -> {after[0]}, "
+                      f"exp {before[1]} -> {after[1]}, attributes {before[2]} -> {after[2]}")
+            ops.append(UpdateOne(
+                {"_id": user["_id"], "level": user.get("level"), "experience": user.get("experience")},
+                {
+                    "$set": {
+                        "level": after[0],
+                        "experience": after[1],
+                        **{f"attributes.{name}": value for name, value in attributes.items()},
+                    },
+                    # Rebuilt from the new base and equipped items on the next read
+                    "$unset": {"effective_attributes": "", "equipment_bonuses": ""},
+                }
+            ))
+
+        counts["users"] += len(users)
+        if apply and ops:
+            result = await db.users.bulk_write(ops, ordered=False)
+            counts["skipped_concurrent"] += len(ops) - result.matched_count
+    return counts
+
+
+async def recompute(chunk_size: int, apply: bool, show: int):
+    await connect_to_mongo()
+    db = get_database()
+    started = time.perf_counter()
+    try:
+        catalog = ExerciseCatalog(reload_mode="off")
+        await catalog.reload()
+        print(f"🧮 Recomputing rewards with exercise catalog v{catalog.version}")
+
+        totals = Accumulator()
+        log_counts = await recompute_logs(db, catalog, chunk_size, apply, totals)
+        await add_quest_experience(db, totals)
+        user_counts = await apply_users(db, totals, chunk_size, apply, show)
+
+        verb = "updated" if apply else "would change"
+        print(f"🏁 {log_counts['logs']} logs ({log_counts['logs_changed']} {verb}, "
+              f"{log_counts['unknown_exercise']} with unknown exercises), "
+              f"{user_counts['users']} users ({user_counts['users_changed']} {verb}"
+              f"{', %d skipped after concurrent updates' % user_counts['skipped_concurrent'] if apply else ''}) "
+              f"in {time.perf_counter() - started:.1f}s")
+        if apply:
+            print("ℹ️  Restart the API (or wait for leaderboard reconciliation) to refresh rankings")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--apply", action="store_true", help="write recomputed logs and users back")
+    parser.add_argument("--show", type=int, default=10, help="print this many user diffs")
+    args = parser.parse_args()
+    asyncio.run(recompute(args.chunk_size, args.apply, args.show))
+
+
+if __name__ == "__main__":
+    main()
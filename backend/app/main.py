@@ -1,8 +1,32 @@
+import time
+
+# Taken before the app's own imports so startup time includes them
+_BOOT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from .routes import auth
-from .services.database import connect_to_mongo, close_mongo_connection
+from fastapi.responses import JSONResponse, PlainTextResponse
+from .routes import auth, exercises, leaderboards, quests, analytics, equipment, duels
+from .services.database import (
+    open_mongo_client, initialize_database, close_mongo_connection, mongodb
+)
+from .auth.password_hasher import password_hasher
+from .services.auth_cache import token_cache, user_cache
+from .services.rate_limiter import rate_limiter
+from .services.exercise_ingestion import exercise_ingestor
+from .services.leaderboard import leaderboard
+from .services.exercise_catalog import exercise_catalog
+from .services.activity import activity
+from .services.token_revocation import revocation_list
+from .services.equipment import item_cache
+from .services.matchmaking import matchmaker, DUEL_WORKER
+from .services.sharded_counter import counters
+from .services.community_quests import community_quests
+from .services.metrics import registry, TimingMiddleware
+from .services.serialization import FastJSONResponse
+from .services.profiler import profiler
+from .services.user_repository import get_user_repository, MemoryUserRepository, STORAGE_BACKEND
+import asyncio
 import logging
 import traceback
 
@@ -13,7 +37,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Singularity API", version="1.0.0")
+app = FastAPI(title="Singularity API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -24,6 +48,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes every other middleware
+app.add_middleware(TimingMiddleware, profiler=profiler)
+
+registry.register_stats("singularity_password_hash", password_hasher.stats)
+registry.register_stats("singularity_token_cache", token_cache.stats)
+registry.register_stats("singularity_user_cache", user_cache.stats)
+registry.register_stats("singularity_rate_limiter", rate_limiter.stats)
+registry.register_stats("singularity_exercise_ingestion", exercise_ingestor.stats)
+registry.register_stats("singularity_leaderboard", leaderboard.stats)
+registry.register_stats("singularity_exercise_catalog", exercise_catalog.stats)
+registry.register_stats("singularity_activity", activity.stats)
+registry.register_stats("singularity_token_revocation", revocation_list.stats)
+registry.register_stats("singularity_item_cache", item_cache.stats)
+registry.register_stats("singularity_matchmaking", matchmaker.stats)
+registry.register_stats("singularity_counters", counters.stats)
+registry.register_stats("singularity_community_quests", community_quests.stats)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -41,18 +82,94 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+app.include_router(exercises.router, prefix="/api/exercises", tags=["Exercises"])
+app.include_router(leaderboards.router, prefix="/api/leaderboards", tags=["Leaderboards"])
+app.include_router(quests.router, prefix="/api/quests", tags=["Quests"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(equipment.router, prefix="/api/equipment", tags=["Equipment"])
+app.include_router(duels.router, prefix="/api/duels", tags=["Duels"])
+
+async def _start_subsystem(name: str, start, database_ready: asyncio.Task = None):
+    """Start one subsystem, after MongoDB is reachable if it needs it.
+
+    Each subsystem fails on its own, so one broken loader does not keep
+    the others from starting.
+    """
+    try:
+        if database_ready is not None:
+            await asyncio.shield(database_ready)
+        result = start()
+        if asyncio.iscoroutine(result):
+            await result
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"⚠️  {name} failed to start: {e}")
+
+async def _initialize_backend():
+    """Reach MongoDB and load database-backed state without blocking startup"""
+    started = time.perf_counter()
+
+    async def connect():
+        await initialize_database()
+        registry.set_gauge("singularity_index_reconcile_seconds", time.perf_counter() - started)
+
+    # initialize_database retries until the server answers; only what reads
+    # from MongoDB waits for it
+    database_ready = asyncio.create_task(connect())
+    try:
+        await asyncio.gather(
+            _start_subsystem("Exercise catalog", exercise_catalog.start,
+                             None if exercise_catalog.path else database_ready),
+            _start_subsystem("Token revocation list", revocation_list.start, database_ready),
+            _start_subsystem("Leaderboard", leaderboard.start,
+                             database_ready if STORAGE_BACKEND == "mongo" else None),
+        )
+        await database_ready
+    except Exception as e:
+        logger.error(f"⚠️  Background initialization failed: {e}")
+        return
+    finally:
+        database_ready.cancel()
+    registry.set_gauge("singularity_ready_seconds", time.perf_counter() - _BOOT_STARTED)
+    logger.info("✅ Singularity API is ready")
 
 @app.on_event("startup")
 async def startup_event():
     try:
-        await connect_to_mongo()
+        profiler.start()
+        rate_limiter.start()
+        exercise_ingestor.start()
+        activity.start()
+        if DUEL_WORKER:
+            matchmaker.start()
+        counters.start()
+        open_mongo_client()
+        app.state.init_task = asyncio.create_task(_initialize_backend())
+        registry.set_gauge("singularity_startup_seconds", time.perf_counter() - _BOOT_STARTED)
         logger.info("🚀 Singularity API started successfully")
     except Exception as e:
         logger.error(f"⚠️  Starting without database connection: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    init_task = getattr(app.state, "init_task", None)
+    if init_task and not init_task.done():
+        init_task.cancel()
+    await rate_limiter.stop()
+    await exercise_ingestor.stop()
+    await activity.stop()
+    await counters.stop()
+    await matchmaker.stop()
+    await leaderboard.stop()
+    await exercise_catalog.stop()
+    await revocation_list.stop()
     await close_mongo_connection()
+    repository = get_user_repository()
+    if isinstance(repository, MemoryUserRepository):
+        repository.close()
+    password_hasher.shutdown()
+    profiler.stop()
     logger.info("🛑 Singularity API shutting down")
 
 @app.get("/")
@@ -74,5 +191,26 @@ async def health_check():
     return {
         "status": "healthy", 
         "message": "Singularity API is running",
-        "database": db_status
-    }
\ No newline at end of file
+        "database": db_status,
+        "user_storage": STORAGE_BACKEND,
+        "exercise_catalog": exercise_catalog.version
+    }
+
+@app.get("/api/ready")
+async def readiness_check():
+    if not mongodb.ready:
+        return JSONResponse(status_code=503, content={"ready": False, "database": "connecting"})
+    if mongodb.index_drift:
+        # Unique indexes that are not enforced would let duplicate users in
+        return JSONResponse(status_code=503, content={"ready": False, "index_drift": mongodb.index_drift})
+    return {"ready": True}
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics/slow")
+async def slow_requests():
+    if not profiler.enabled:
+        return JSONResponse(status_code=404, content={"detail": "Profiler is disabled (set PROFILER_ENABLED=true)"})
+    return {"requests": profiler.slowest()}
\ No newline at end of file
@@ -1,3 +1,3 @@
-from .user import User, UserCreate, UserLogin, UserResponse
-from .exercise import Exercise, ExerciseLog, ExerciseCreate
+from .user import User, UserCreate, UserLogin, UserResponse, TokenResponse
+from .exercise import Exercise, ExerciseLog, ExerciseCreate, ExerciseLogPage
 from .game import PlayerAttributes, LevelProgression, Quest, Item
\ No newline at end of file
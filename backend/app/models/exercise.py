@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from enum import Enum
 
 class ExerciseType(str, Enum):
@@ -20,14 +20,25 @@ class Exercise(ExerciseBase):
 
 class ExerciseCreate(BaseModel):
     exercise_id: str
-    reps: Optional[int] = None
-    sets: Optional[int] = None
-    duration_minutes: Optional[int] = None
-    weight_kg: Optional[float] = None
+    # Bounded so one request cannot farm unlimited (or negative) experience
+    reps: Optional[int] = Field(None, ge=0, le=1000)
+    sets: Optional[int] = Field(None, ge=1, le=100)
+    duration_minutes: Optional[int] = Field(None, ge=0, le=600)
+    weight_kg: Optional[float] = Field(None, ge=0, le=500)
+    completed_at: Optional[datetime] = None
 
 class ExerciseLog(ExerciseCreate):
     id: str
     user_id: str
+    # Stored logs may predate the input bounds; read them back as they are
+    reps: Optional[int] = None
+    sets: Optional[int] = None
+    duration_minutes: Optional[int] = None
+    weight_kg: Optional[float] = None
     completed_at: datetime
     experience_gained: int
-    attributes_gained: Dict[str, int] = {}
\ No newline at end of file
+    attributes_gained: Dict[str, int] = {}
+
+class ExerciseLogPage(BaseModel):
+    logs: List[ExerciseLog]
+    next_cursor: Optional[str] = None
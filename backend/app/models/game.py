@@ -18,7 +18,7 @@ class Quest(BaseModel):
     id: str
     title: str
     description: str
-    quest_type: str  # "daily", "weekly", "story"
+    quest_type: str  # "daily", "weekly", "story", "community"
     requirements: Dict[str, int]  # {"pushups": 50, "squats": 30}
     rewards: Dict[str, int]  # {"exp": 100, "gold": 50}
     is_completed: bool = False
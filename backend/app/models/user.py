@@ -26,11 +26,22 @@ class UserResponse(UserBase):
     id: str
     level: int = 1
     experience: int = 0
+    energy: Optional[int] = None
+    max_energy: Optional[int] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    user: UserResponse
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class User(UserResponse):
     hashed_password: str
     energy: int = 100
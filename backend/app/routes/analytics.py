@@ -0,0 +1,29 @@
+# backend/app/routes/analytics.py
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Literal, Optional
+from datetime import datetime, timedelta
+from ..services.analytics import AnalyticsService, to_utc_naive
+from .auth import get_current_user
+
+router = APIRouter()
+
+DEFAULT_RANGE = {"day": timedelta(days=30), "week": timedelta(weeks=12)}
+MAX_RANGE = {"day": timedelta(days=366), "week": timedelta(weeks=260)}
+
+@router.get("/me")
+async def my_rollups(period: Literal["day", "week"] = "day",
+                     start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     current_user: dict = Depends(get_current_user)):
+    end = to_utc_naive(end) or datetime.utcnow()
+    start = to_utc_naive(start) or end - DEFAULT_RANGE[period]
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > MAX_RANGE[period]:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE[period].days} days")
+    
+    buckets = await AnalyticsService.get_rollups(current_user["id"], period, start, end)
+    return {"period": period, "start": start, "end": end, "buckets": buckets}
+
+@router.get("/me/summary")
+async def my_summary(days: int = Query(30, ge=1, le=366), current_user: dict = Depends(get_current_user)):
+    return await AnalyticsService.get_summary(current_user["id"], days)
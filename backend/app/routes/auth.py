@@ -1,147 +1,159 @@
 # backend/app/routes/auth.py
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from ..models.user import UserCreate, UserLogin, UserResponse
-from ..services.user_service import UserService, UserServiceError
-from ..services.database import get_database
+from ..models.user import UserCreate, UserLogin, UserResponse, TokenResponse, RefreshRequest
+from ..services.user_service import UserService, UserServiceError, PROFILE_PROJECTION
+from ..services.auth_cache import token_cache, user_cache
+from ..services.rate_limiter import rate_limiter
+from ..services.token_revocation import revocation_list
+from ..services.energy import with_current_energy
+from ..services.serialization import (
+    token_response, json_response, user_response, user_response_adapter
+)
 from ..auth.auth_handler import (
     verify_token, create_access_token, create_refresh_token, validate_password_strength
 )
-from datetime import timedelta, datetime
-from bson import ObjectId
-import time
+from ..auth.password_hasher import PasswordHasherBusy
+from typing import Optional
+import math
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 security = HTTPBearer()
 
-# Simple rate limiting (in production, use Redis)
-request_counts = {}
-RATE_LIMIT_REQUESTS = 5
-RATE_LIMIT_WINDOW = 300  # 5 minutes
+BUSY_DETAIL = "Server is busy. Please try again shortly."
 
-def rate_limit_check(request: Request):
-    client_ip = request.client.host
-    current_time = time.time()
-    
-    if client_ip not in request_counts:
-        request_counts[client_ip] = []
-    
-    # Clean old requests
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts[client_ip]
-        if current_time - req_time < RATE_LIMIT_WINDOW
-    ]
-    
-    if len(request_counts[client_ip]) >= RATE_LIMIT_REQUESTS:
-        raise HTTPException(
-            status_code=429,
-            detail="Too many requests. Please try again later."
-        )
-    
-    request_counts[client_ip].append(current_time)
+def rate_limit(policy_name: str):
+    """Dependency enforcing the named rate limit policy per client IP"""
+    async def check(request: Request):
+        retry_after = await rate_limiter.check(policy_name, request.client.host)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+    return check
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        token = credentials.credentials
+def access_token_payload(token: str) -> dict:
+    """Decoded access token, rejecting invalid and revoked ones without I/O"""
+    payload = token_cache.get(token)
+    if payload is None:
         payload = verify_token(token)
         if not payload:
             raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.put(token, payload)
+    # Checked on every request so cached payloads honour revocation too
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return payload
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    try:
+        payload = access_token_payload(credentials.credentials)
         
-        user = await UserService.get_user_by_email(payload.get("email"))
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+        user = user_cache.get_by_email(payload.get("email"))
+        if user is None:
+            user = await UserService.get_user_by_email(payload.get("email"), PROFILE_PROJECTION)
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            user_cache.put(user)
         
         return user
     except UserServiceError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/register", response_model=dict)
-async def register(user_data: UserCreate, request: Request):
+@router.post("/register", response_model=TokenResponse, dependencies=[Depends(rate_limit("register"))])
+async def register(user_data: UserCreate):
     try:
-        rate_limit_check(request)
-        
         # Validate password strength
         is_valid, message = validate_password_strength(user_data.password)
         if not is_valid:
             raise HTTPException(status_code=400, detail=message)
         
         user_dict = user_data.dict()
-        user_id = await UserService.create_user(user_dict)
-        user = await UserService.get_user_by_id(user_id)
+        user = await UserService.create_user(user_dict)
         
         # Create tokens
         access_token = create_access_token(data={"email": user["email"]})
         refresh_token = create_refresh_token(data={"email": user["email"]})
         
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
-            "user": UserResponse(**user)
-        }
+        return token_response(access_token, refresh_token, with_current_energy(user))
         
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail=BUSY_DETAIL, headers={"Retry-After": "1"})
     except UserServiceError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Registration error: {e}")
         raise HTTPException(status_code=500, detail="Registration failed")
 
-@router.post("/login")
-async def login(login_data: UserLogin, request: Request):
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(rate_limit("login"))])
+async def login(login_data: UserLogin):
     try:
-        rate_limit_check(request)
-        
         user = await UserService.authenticate_user(login_data.email, login_data.password)
         if not user:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        # Update last login
-        try:
-            db = get_database()
-            await db.users.update_one(
-                {"_id": ObjectId(user["id"])},
-                {"$set": {"last_login": datetime.utcnow()}}
-            )
-        except Exception as e:
-            logger.warning(f"Could not update last login: {e}")
+        UserService.record_login(user["id"])
         
         access_token = create_access_token(data={"email": user["email"]})
         refresh_token = create_refresh_token(data={"email": user["email"]})
         
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
-            "user": UserResponse(**user)
-        }
+        return token_response(access_token, refresh_token, with_current_energy(user))
         
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail=BUSY_DETAIL, headers={"Retry-After": "1"})
     except UserServiceError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="Login failed")
 
-@router.post("/refresh")
-async def refresh_token(refresh_token: str):
+@router.post("/refresh", dependencies=[Depends(rate_limit("refresh"))])
+async def refresh_token(body: Optional[RefreshRequest] = None, refresh_token: Optional[str] = None):
     try:
-        payload = verify_token(refresh_token, "refresh")
-        if not payload:
+        token = body.refresh_token if body else refresh_token
+        payload = verify_token(token, "refresh") if token else None
+        if not payload or not payload.get("jti"):
             raise HTTPException(status_code=401, detail="Invalid refresh token")
         
-        # Create new access token
+        # Single use: only the request that records the revocation may rotate it
+        jti = payload["jti"]
+        if revocation_list.is_revoked(jti) or not await revocation_list.revoke(jti, payload["exp"], "rotated"):
+            logger.warning(f"Reuse of refresh token {jti} for {payload.get('email')}")
+            raise HTTPException(status_code=401, detail="Refresh token has already been used")
+        
         access_token = create_access_token(data={"email": payload.get("email")})
+        new_refresh_token = create_refresh_token(data={"email": payload.get("email")})
         
         return {
             "access_token": access_token,
+            "refresh_token": new_refresh_token,
             "token_type": "bearer"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Token refresh error: {e}")
         raise HTTPException(status_code=401, detail="Token refresh failed")
 
+@router.post("/logout")
+async def logout(body: Optional[RefreshRequest] = None,
+                 credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = access_token_payload(credentials.credentials)
+    if payload.get("jti"):
+        await revocation_list.revoke(payload["jti"], payload["exp"], "logout")
+    
+    if body:
+        refresh_payload = verify_token(body.refresh_token, "refresh")
+        if refresh_payload and refresh_payload.get("jti") and refresh_payload.get("email") == payload.get("email"):
+            await revocation_list.revoke(refresh_payload["jti"], refresh_payload["exp"], "logout")
+    
+    return {"message": "Logged out"}
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
-    return UserResponse(**current_user)
\ No newline at end of file
+    return json_response(user_response_adapter, user_response(with_current_energy(current_user)))
\ No newline at end of file
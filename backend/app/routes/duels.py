@@ -0,0 +1,63 @@
+# backend/app/routes/duels.py
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from ..services.matchmaking import (
+    matchmaker, MatchmakingError, MATCHMAKING_POLL_TIMEOUT, DUEL_ENERGY_COST, DUEL_WORKER, DUEL_PORT
+)
+from ..services.user_service import UserService
+from ..services.energy import InsufficientEnergy
+from .auth import get_current_user
+
+def require_duel_worker():
+    """The queue lives on one worker only; see ``app.server``"""
+    if DUEL_WORKER:
+        return
+    if DUEL_PORT:
+        raise HTTPException(status_code=421, detail=f"Duels are served on port {DUEL_PORT}")
+    raise HTTPException(status_code=503, detail="Duels are disabled: several workers and no DUEL_PORT")
+
+router = APIRouter(dependencies=[Depends(require_duel_worker)])
+
+# Users whose energy is being spent; a second join meanwhile would pay twice
+_joining = set()
+
+@router.post("/queue", status_code=201)
+async def join_queue(current_user: dict = Depends(get_current_user)):
+    user_id = current_user["id"]
+    if user_id in _joining or matchmaker.is_queued(user_id):
+        raise HTTPException(status_code=409, detail="Already queued")
+    _joining.add(user_id)
+    try:
+        energy = None
+        if DUEL_ENERGY_COST > 0:
+            energy = (await UserService.spend_energy(user_id, DUEL_ENERGY_COST))["energy"]
+        ticket = matchmaker.enqueue(current_user, DUEL_ENERGY_COST)
+    except InsufficientEnergy as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except MatchmakingError as e:
+        if energy is not None:
+            await UserService.refund_energy(user_id, DUEL_ENERGY_COST)
+        raise HTTPException(status_code=409 if str(e) == "Already queued" else 400, detail=str(e))
+    finally:
+        _joining.discard(user_id)
+    return {"status": "queued", "user_class": ticket.user_class, "level": ticket.level,
+            "energy": energy}
+
+@router.get("/queue")
+async def wait_for_match(timeout: float = Query(MATCHMAKING_POLL_TIMEOUT, ge=0, le=MATCHMAKING_POLL_TIMEOUT),
+                         current_user: dict = Depends(get_current_user)):
+    """Long-poll: returns as soon as a match is made, or after ``timeout`` seconds"""
+    try:
+        match = await matchmaker.wait(current_user["id"], timeout)
+    except MatchmakingError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if match is not None:
+        return {"status": "matched", "match": match}
+    if not matchmaker.is_queued(current_user["id"]):
+        raise HTTPException(status_code=404, detail="Not queued")
+    return {"status": "waiting"}
+
+@router.delete("/queue", status_code=204)
+async def leave_queue(current_user: dict = Depends(get_current_user)):
+    if not matchmaker.cancel(current_user["id"]):
+        raise HTTPException(status_code=404, detail="Not queued")
+    return Response(status_code=204)
@@ -0,0 +1,42 @@
+# backend/app/routes/equipment.py
+from fastapi import APIRouter, HTTPException, Depends
+from ..services.equipment import EquipmentService, EquipmentServiceError
+from .auth import get_current_user
+
+router = APIRouter()
+
+ERROR_STATUS = {
+    "Item not found": 404,
+    "Unknown item": 404,
+    "Item already equipped": 409,
+    "Item not equipped": 409,
+    "Slot is busy": 409,
+}
+
+def _http_error(e: EquipmentServiceError) -> HTTPException:
+    return HTTPException(status_code=ERROR_STATUS.get(str(e), 400), detail=str(e))
+
+@router.get("/me")
+async def my_equipment(current_user: dict = Depends(get_current_user)):
+    return {
+        "inventory": await EquipmentService.get_inventory(current_user["id"]),
+        "effective_attributes": await EquipmentService.get_effective_attributes(current_user["id"]),
+    }
+
+@router.get("/me/stats")
+async def my_effective_stats(current_user: dict = Depends(get_current_user)):
+    return {"effective_attributes": await EquipmentService.get_effective_attributes(current_user["id"])}
+
+@router.post("/{inventory_id}/equip")
+async def equip_item(inventory_id: str, current_user: dict = Depends(get_current_user)):
+    try:
+        return {"effective_attributes": await EquipmentService.equip(current_user["id"], inventory_id)}
+    except EquipmentServiceError as e:
+        raise _http_error(e)
+
+@router.post("/{inventory_id}/unequip")
+async def unequip_item(inventory_id: str, current_user: dict = Depends(get_current_user)):
+    try:
+        return {"effective_attributes": await EquipmentService.unequip(current_user["id"], inventory_id)}
+    except EquipmentServiceError as e:
+        raise _http_error(e)
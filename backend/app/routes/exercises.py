@@ -0,0 +1,90 @@
+# backend/app/routes/exercises.py
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from ..models.exercise import ExerciseCreate, ExerciseLogPage
+from ..services.exercise_service import (
+    ExerciseService, ExerciseServiceError, calculate_rewards
+)
+from ..services.exercise_catalog import exercise_catalog
+from ..services.exercise_ingestion import exercise_ingestor, IngestionBusy, INGEST_MAX_BUFFER
+from ..services.analytics import to_utc_naive
+from ..services.serialization import json_response, log_page_adapter
+from .auth import get_current_user, BUSY_DETAIL
+from datetime import datetime
+from bson import ObjectId
+from contextlib import aclosing
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+MAX_LOG_BATCH = min(int(os.getenv("MAX_LOG_BATCH", 1000)), INGEST_MAX_BUFFER)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+
+class ExerciseLogBatch(BaseModel):
+    logs: List[ExerciseCreate] = Field(..., min_length=1, max_length=MAX_LOG_BATCH)
+
+@router.post("/logs/bulk", status_code=202)
+async def bulk_log_exercises(batch: ExerciseLogBatch, current_user: dict = Depends(get_current_user)):
+    try:
+        if not exercise_catalog.loaded:
+            raise IngestionBusy("Exercise catalog is not loaded yet")
+        exercises = exercise_catalog.resolve(log.exercise_id for log in batch.logs)
+        unknown = sorted({log.exercise_id for log in batch.logs} - exercises.keys())
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown exercises: {', '.join(unknown)}")
+        
+        now = datetime.utcnow()
+        documents = []
+        for log in batch.logs:
+            entry = log.model_dump()
+            exercise = exercises[log.exercise_id]
+            experience, attributes = calculate_rewards(exercise, entry)
+            entry.update({
+                "_id": ObjectId(),
+                "user_id": current_user["id"],
+                "exercise_type": exercise["exercise_type"],
+                "completed_at": to_utc_naive(entry["completed_at"]) or now,
+                "experience_gained": experience,
+                "attributes_gained": attributes
+            })
+            documents.append(entry)
+        
+        await exercise_ingestor.submit(documents)
+        
+        return {
+            "accepted": len(documents),
+            "ids": [str(doc["_id"]) for doc in documents],
+            "experience_gained": sum(doc["experience_gained"] for doc in documents)
+        }
+        
+    except IngestionBusy:
+        raise HTTPException(status_code=503, detail=BUSY_DETAIL, headers={"Retry-After": "1"})
+
+@router.get("/logs", response_model=ExerciseLogPage)
+async def get_exercise_history(limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None,
+                               current_user: dict = Depends(get_current_user)):
+    try:
+        logs, next_cursor = await ExerciseService.get_log_page(current_user["id"], limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExerciseServiceError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return json_response(log_page_adapter, ExerciseLogPage.model_construct(logs=logs, next_cursor=next_cursor))
+
+@router.get("/logs/export")
+async def export_exercise_history(current_user: dict = Depends(get_current_user)):
+    async def lines():
+        # aclosing releases the database cursor if the client disconnects
+        async with aclosing(ExerciseService.iter_logs(current_user["id"], EXPORT_BATCH_SIZE)) as batches:
+            async for batch in batches:
+                yield b"".join(log.model_dump_json().encode() + b"\n" for log in batch)
+    
+    filename = f"exercise-history-{current_user['id']}.ndjson"
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
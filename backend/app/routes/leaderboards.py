@@ -0,0 +1,36 @@
+# backend/app/routes/leaderboards.py
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from ..models.user import UserClass
+from ..services.leaderboard import leaderboard, METRICS, GLOBAL_SCOPE
+from .auth import get_current_user
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+def _scope(metric: str, user_class: Optional[UserClass]) -> str:
+    if metric not in METRICS:
+        raise HTTPException(status_code=404, detail=f"Unknown leaderboard: {metric}")
+    return user_class.value if user_class else GLOBAL_SCOPE
+
+@router.get("/{metric}")
+async def get_top(metric: str, user_class: Optional[UserClass] = None,
+                  limit: int = Query(10, ge=1, le=100)):
+    scope = _scope(metric, user_class)
+    return {"metric": metric, "scope": scope, "entries": leaderboard.top(metric, scope, limit)}
+
+@router.get("/{metric}/users/{user_id}")
+async def get_user_rank(metric: str, user_id: str, user_class: Optional[UserClass] = None):
+    scope = _scope(metric, user_class)
+    entry = leaderboard.rank(metric, user_id, scope)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="User is not ranked")
+    return {"metric": metric, "scope": scope, **entry}
+
+@router.get("/{metric}/users/{user_id}/around")
+async def get_users_around(metric: str, user_id: str, user_class: Optional[UserClass] = None,
+                           radius: int = Query(5, ge=1, le=50)):
+    scope = _scope(metric, user_class)
+    entries = leaderboard.around(metric, user_id, scope, radius)
+    if not entries:
+        raise HTTPException(status_code=404, detail="User is not ranked")
+    return {"metric": metric, "scope": scope, "entries": entries}
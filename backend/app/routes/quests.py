@@ -0,0 +1,33 @@
+# backend/app/routes/quests.py
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Optional, Literal
+from ..models.game import Quest
+from ..services.quest_service import QuestService, QuestServiceError
+from ..services.community_quests import community_quests
+from .auth import get_current_user
+
+router = APIRouter()
+
+@router.get("", response_model=List[Quest])
+async def list_quests(quest_type: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    try:
+        return await QuestService.get_quests(quest_type)
+    except QuestServiceError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/community")
+async def list_community_quests(current_user: dict = Depends(get_current_user)):
+    return {"quests": await community_quests.get_quests()}
+
+@router.get("/me")
+async def my_quests(status: Optional[Literal["active", "completed"]] = None,
+                    current_user: dict = Depends(get_current_user)):
+    return {"quests": await QuestService.get_user_quests(current_user["id"], status)}
+
+@router.post("/{quest_id}/accept", status_code=201)
+async def accept_quest(quest_id: str, current_user: dict = Depends(get_current_user)):
+    try:
+        return await QuestService.accept_quest(current_user["id"], quest_id)
+    except QuestServiceError as e:
+        status_code = {"Quest not found": 404, "Quest already accepted": 409}.get(str(e), 400)
+        raise HTTPException(status_code=status_code, detail=str(e))
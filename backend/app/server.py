@@ -0,0 +1,216 @@
+# backend/app/server.py
+"""Production launcher: a small prefork supervisor around uvicorn.
+
+The supervisor binds the listening socket once, then spawns
+``WEB_CONCURRENCY`` uvicorn workers that share it. Nothing stateful is
+created before the fork: every worker imports the app itself and opens its
+own MongoDB client in ``startup_event``. A worker exits after roughly
+``MAX_REQUESTS_PER_WORKER`` requests (jittered so they do not all recycle
+together) and the supervisor replaces it. On SIGTERM/SIGINT each worker
+stops accepting connections, finishes in-flight requests for up to
+``GRACEFUL_SHUTDOWN_TIMEOUT`` seconds and runs ``shutdown_event``.
+
+A worker that fails within ``WORKER_MIN_UPTIME`` seconds of starting counts
+as a crash; its replacement waits ``WORKER_RESTART_DELAY`` seconds,
+doubling per consecutive crash up to ``WORKER_RESTART_MAX_DELAY``, and
+after ``WORKER_MAX_CRASHES`` crashes in a row the supervisor stops.
+
+Duel matchmaking keeps its queue in worker memory, so exactly one worker
+runs it: with several workers it is worker 0, which also listens on
+``DUEL_PORT``; route ``/api/duels`` there in the reverse proxy. The other
+workers answer duel requests with 421. Without ``DUEL_PORT`` duels are
+only served when there is a single worker.
+
+The in-memory user store lives inside each worker, so several workers
+cannot share one ``STORAGE_LOG_PATH``; that combination is refused.
+"""
+import importlib.util
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+import uvicorn
+from .services.user_repository import STORAGE_BACKEND, STORAGE_LOG_PATH
+
+load_dotenv()
+
+# Share uvicorn's configured error logger so supervisor messages are visible
+logger = logging.getLogger("uvicorn.error")
+
+APP = "app.main:app"
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+SERVER_LOOP = os.getenv("SERVER_LOOP", "uvloop")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "httptools")
+MAX_REQUESTS_PER_WORKER = int(os.getenv("MAX_REQUESTS_PER_WORKER", 0))  # 0 disables recycling
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", 0))
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 30))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", 2048))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+WORKER_MIN_UPTIME = float(os.getenv("WORKER_MIN_UPTIME", 10))
+WORKER_RESTART_DELAY = float(os.getenv("WORKER_RESTART_DELAY", 1))
+WORKER_RESTART_MAX_DELAY = float(os.getenv("WORKER_RESTART_MAX_DELAY", 60))
+WORKER_MAX_CRASHES = int(os.getenv("WORKER_MAX_CRASHES", 10))
+DUEL_PORT = int(os.getenv("DUEL_PORT", 0))  # 0: no dedicated duel listener
+
+# Workers are spawned, not forked: each one starts from a clean interpreter
+multiprocessing.allow_connection_pickling()
+spawn = multiprocessing.get_context("spawn")
+
+
+def _available(module: str, setting: str, fallback: str) -> str:
+    if setting == module and importlib.util.find_spec(module) is None:
+        logger.warning(f"{module} is not installed, falling back to {fallback}")
+        return fallback
+    return setting
+
+
+def _worker_config(workers: int) -> uvicorn.Config:
+    limit = None
+    if MAX_REQUESTS_PER_WORKER > 0:
+        limit = MAX_REQUESTS_PER_WORKER + random.randint(0, MAX_REQUESTS_JITTER)
+    return uvicorn.Config(
+        APP,
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop=_available("uvloop", SERVER_LOOP, "asyncio"),
+        http=_available("httptools", SERVER_HTTP, "h11"),
+        limit_max_requests=limit,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        backlog=SERVER_BACKLOG,
+        log_level=LOG_LEVEL,
+        access_log=False,
+        proxy_headers=True,
+    )
+
+
+def _run_worker(config: uvicorn.Config, sockets: list, duel_worker: bool):
+    # Read by app.services.matchmaking, which the app imports below
+    os.environ["DUEL_WORKER"] = "true" if duel_worker else "false"
+    # Logging has to be configured again in the spawned interpreter
+    config.configure_logging()
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+class Supervisor:
+    def __init__(self, workers: int = WEB_CONCURRENCY):
+        self.workers = max(1, workers)
+        self.should_exit = threading.Event()
+        self.processes = []
+        self.sockets = []
+        self.duel_slot = None
+        self.started_at = []
+        self.crashes = []
+        self.restart_at = []
+        self.recycled = 0
+        self.exit_code = 0
+
+    def _spawn(self, i: int):
+        process = spawn.Process(
+            target=_run_worker, args=(_worker_config(self.workers), self.sockets[i], i == self.duel_slot)
+        )
+        process.start()
+        self.processes[i] = process
+        self.started_at[i] = time.monotonic()
+
+    def _reap(self, i: int, now: float):
+        """Handle a worker that exited: schedule its replacement, with backoff after crashes"""
+        process = self.processes[i]
+        process.join()
+        self.processes[i] = None
+        if process.exitcode == 0 or now - self.started_at[i] >= WORKER_MIN_UPTIME:
+            self.crashes[i] = 0
+            self.recycled += 1
+            self.restart_at[i] = now
+            logger.info(f"Worker {process.pid} exited ({process.exitcode}), starting a replacement")
+            return
+
+        self.crashes[i] += 1
+        if self.crashes[i] >= WORKER_MAX_CRASHES:
+            logger.error(f"Worker crashed {self.crashes[i]} times in a row "
+                         f"(last exit code {process.exitcode}), shutting down")
+            self.exit_code = 1
+            self.should_exit.set()
+            return
+        delay = min(WORKER_RESTART_DELAY * 2 ** (self.crashes[i] - 1), WORKER_RESTART_MAX_DELAY)
+        self.restart_at[i] = now + delay
+        logger.warning(f"Worker {process.pid} crashed after {now - self.started_at[i]:.1f}s "
+                       f"({process.exitcode}), restarting in {delay:.1f}s")
+
+    def _signal(self, signum, frame):
+        logger.info(f"Received {signal.Signals(signum).name}, draining workers")
+        self.should_exit.set()
+
+    def run(self):
+        # Building the config configures logging; the app itself is only
+        # imported inside the workers
+        config = _worker_config(self.workers)
+        sock = config.bind_socket()
+        listeners = [sock]
+        self.sockets = [[sock] for _ in range(self.workers)]
+        if DUEL_PORT:
+            duel_config = _worker_config(self.workers)
+            duel_config.port = DUEL_PORT
+            duel_sock = duel_config.bind_socket()
+            listeners.append(duel_sock)
+            self.sockets[0] = [sock, duel_sock]
+            logger.info(f"Duels are served by worker 0 on {HOST}:{DUEL_PORT}")
+        if DUEL_PORT or self.workers == 1:
+            self.duel_slot = 0
+        else:
+            logger.warning("Duels are disabled: several workers need DUEL_PORT to pin matchmaking to one")
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._signal)
+
+        logger.info(f"Starting {self.workers} workers on {HOST}:{PORT} "
+                    f"(loop={config.loop}, http={config.http})")
+        self.processes = [None] * self.workers
+        self.started_at = [0.0] * self.workers
+        self.crashes = [0] * self.workers
+        self.restart_at = [0.0] * self.workers
+        for i in range(self.workers):
+            self._spawn(i)
+
+        while not self.should_exit.wait(0.5):
+            now = time.monotonic()
+            for i, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    self._reap(i, now)
+                if self.should_exit.is_set():
+                    break
+                if self.processes[i] is None and now >= self.restart_at[i]:
+                    self._spawn(i)
+
+        running = [process for process in self.processes if process is not None]
+        for process in running:
+            if process.is_alive():
+                process.terminate()  # SIGTERM: uvicorn drains, then runs shutdown_event
+        for process in running:
+            process.join(GRACEFUL_SHUTDOWN_TIMEOUT + 5)
+            if process.is_alive():
+                logger.warning(f"Worker {process.pid} did not drain in time, killing it")
+                process.kill()
+                process.join()
+        for listener in listeners:
+            listener.close()
+        logger.info("All workers stopped")
+
+
+def serve_production(workers: int = WEB_CONCURRENCY):
+    if workers > 1 and STORAGE_BACKEND == "memory":
+        if STORAGE_LOG_PATH:
+            # Every worker would replay and append to the same log independently
+            raise SystemExit("STORAGE_BACKEND=memory with STORAGE_LOG_PATH needs a single worker "
+                             "(set WEB_CONCURRENCY=1 or use STORAGE_BACKEND=mongo)")
+        logger.warning("STORAGE_BACKEND=memory keeps separate users in every worker")
+    supervisor = Supervisor(workers)
+    supervisor.run()
+    if supervisor.exit_code:
+        sys.exit(supervisor.exit_code)
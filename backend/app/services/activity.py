@@ -0,0 +1,106 @@
+# backend/app/services/activity.py
+"""Write-behind coalescing of low-value user timestamps.
+
+``last_login`` and ``last_activity`` do not need to be durable the moment
+they happen. Request handlers call ``touch``, which only records the
+latest timestamp per user and field in memory; a background task writes
+everything pending with one ``touch_many`` (a single ``bulk_write`` on
+MongoDB) per ``ACTIVITY_FLUSH_INTERVAL``. Stored values only move
+forward, so workers flushing out of order cannot roll a timestamp back.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import os
+import logging
+from dotenv import load_dotenv
+from ..services.user_repository import get_user_repository
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", 5.0))
+ACTIVITY_MAX_PENDING = int(os.getenv("ACTIVITY_MAX_PENDING", 10000))
+
+
+class ActivityCoalescer:
+    def __init__(self, flush_interval: float = ACTIVITY_FLUSH_INTERVAL,
+                 max_pending: int = ACTIVITY_MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[str, datetime]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.touches = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def touch(self, user_id: str, field: str, when: Optional[datetime] = None):
+        """Record that ``field`` should be at least ``when`` (default now)"""
+        when = when or datetime.utcnow()
+        fields = self._pending.setdefault(user_id, {})
+        if field not in fields or fields[field] < when:
+            fields[field] = when
+        self.touches += 1
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _restore(self, batch: Dict[str, Dict[str, datetime]]):
+        for user_id, fields in batch.items():
+            for field, when in fields.items():
+                self.touch(user_id, field, when)
+            self.touches -= len(fields)
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await get_user_repository().touch_many(batch)
+            self.flushed += len(batch)
+            self.flushes += 1
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Activity flush of {len(batch)} users failed: {e}")
+            self._restore(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write whatever is still pending, then stop the background task"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "touches": self.touches,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+activity = ActivityCoalescer()
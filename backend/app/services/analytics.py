@@ -0,0 +1,118 @@
+# backend/app/services/analytics.py
+"""Progress analytics served from precomputed rollups.
+
+``exercise_rollups`` holds one document per user, period (``day`` or
+``week``, weeks starting on Monday, UTC) and bucket start. Each document
+carries totals plus per-``ExerciseType`` counters::
+
+    {"_id": "<user>:day:2024-05-06", "user_id": ..., "period": "day",
+     "start": datetime(2024, 5, 6), "count": 3, "experience": 120,
+     "types": {"strength": {"count": 2, "experience": 90, "reps": 60, "minutes": 0}}}
+
+The ingestion flush adds each batch with ``$inc`` upserts, so the read
+endpoints never touch raw ``exercise_logs``.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from pymongo import UpdateOne
+import logging
+from ..services.database import get_database
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("day", "week")
+
+
+def to_utc_naive(moment: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, the form logs and rollups are stored in"""
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    moment = to_utc_naive(moment)
+    day = datetime(moment.year, moment.month, moment.day)
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def rollup_id(user_id: str, period: str, start: datetime) -> str:
+    return f"{user_id}:{period}:{start:%Y-%m-%d}"
+
+
+def rollup_increments(logs: Iterable[dict]) -> Dict[tuple, Dict[str, int]]:
+    """Sum logs into ``{(user_id, period, start): {field: amount}}``"""
+    increments: Dict[tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for log in logs:
+        exercise_type = str(getattr(log["exercise_type"], "value", log["exercise_type"]))
+        reps = (log.get("reps") or 0) * (log.get("sets") or 1)
+        values = {
+            "count": 1,
+            "experience": log.get("experience_gained", 0),
+            f"types.{exercise_type}.count": 1,
+            f"types.{exercise_type}.experience": log.get("experience_gained", 0),
+            f"types.{exercise_type}.reps": reps,
+            f"types.{exercise_type}.minutes": log.get("duration_minutes") or 0,
+        }
+        for period in PERIODS:
+            fields = increments[(log["user_id"], period, bucket_start(log["completed_at"], period))]
+            for field, amount in values.items():
+                fields[field] += amount
+    return increments
+
+
+def rollup_updates(increments: Dict[tuple, Dict[str, int]]) -> List[UpdateOne]:
+    return [
+        UpdateOne(
+            {"_id": rollup_id(user_id, period, start)},
+            {
+                "$inc": dict(fields),
+                "$setOnInsert": {"user_id": user_id, "period": period, "start": start},
+            },
+            upsert=True
+        )
+        for (user_id, period, start), fields in increments.items()
+    ]
+
+
+class AnalyticsService:
+    @staticmethod
+    async def record_logs(logs: List[dict]):
+        """Fold a batch of stored exercise logs into the rollups"""
+        updates = rollup_updates(rollup_increments(logs))
+        if updates:
+            await get_database().exercise_rollups.bulk_write(updates, ordered=False)
+
+    @staticmethod
+    async def get_rollups(user_id: str, period: str, start: datetime, end: datetime) -> List[dict]:
+        """Buckets starting in ``[start, end)``, oldest first"""
+        cursor = get_database().exercise_rollups.find(
+            {"user_id": user_id, "period": period,
+             "start": {"$gte": bucket_start(start, period), "$lt": end}},
+            {"_id": 0, "user_id": 0}
+        ).sort("start", 1)
+        return await cursor.to_list(None)
+
+    @staticmethod
+    async def get_summary(user_id: str, days: int, now: Optional[datetime] = None) -> dict:
+        """Totals per exercise type over the last ``days`` daily buckets"""
+        end = bucket_start(now or datetime.utcnow(), "day") + timedelta(days=1)
+        start = end - timedelta(days=days)
+        buckets = await AnalyticsService.get_rollups(user_id, "day", start, end)
+
+        types: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for bucket in buckets:
+            for exercise_type, fields in (bucket.get("types") or {}).items():
+                for field, amount in fields.items():
+                    types[exercise_type][field] += amount
+        return {
+            "start": start,
+            "end": end,
+            "active_days": len(buckets),
+            "count": sum(b.get("count", 0) for b in buckets),
+            "experience": sum(b.get("experience", 0) for b in buckets),
+            "types": {t: dict(fields) for t, fields in types.items()},
+        }
@@ -0,0 +1,81 @@
+# backend/app/services/auth_cache.py
+from typing import Optional
+import hashlib
+import os
+import time
+from dotenv import load_dotenv
+from .cache import TTLCache
+
+load_dotenv()
+
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", 10000))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 300))
+# Invalidation only reaches the worker that made the change: every other
+# worker may keep serving the old user document (energy, level, a changed
+# email) for up to this long. 0 disables the user cache.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+
+
+class TokenCache:
+    """Decoded JWT payloads keyed by a digest of the raw token"""
+
+    def __init__(self, maxsize: int = AUTH_CACHE_MAX_SIZE, ttl: float = TOKEN_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        return self._cache.get(self._key(token))
+
+    def put(self, token: str, payload: dict):
+        # Never serve a payload past the token's own expiry
+        exp = payload.get("exp")
+        ttl = None if exp is None else exp - time.time()
+        self._cache.set(self._key(token), payload, ttl=ttl)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class UserCache:
+    """User documents reachable by both email and id.
+
+    Each document is stored once per key; invalidating through either key
+    drops both so a stale copy cannot be served through the other one.
+    Both are per process, so other workers see a change only once their
+    copy expires after ``USER_CACHE_TTL_SECONDS``.
+    """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_MAX_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize * 2, ttl=ttl)
+
+    def get_by_email(self, email: str) -> Optional[dict]:
+        user = self._cache.get(("email", email.lower()))
+        return dict(user) if user is not None else None
+
+    def get_by_id(self, user_id: str) -> Optional[dict]:
+        user = self._cache.get(("id", user_id))
+        return dict(user) if user is not None else None
+
+    def put(self, user: dict):
+        user = dict(user)
+        self._cache.set(("email", user["email"].lower()), user)
+        self._cache.set(("id", user["id"]), user)
+
+    def invalidate(self, user_id: Optional[str] = None, email: Optional[str] = None):
+        for key in (("id", user_id), ("email", email.lower() if email else None)):
+            if key[1] is None:
+                continue
+            user = self._cache.pop(key)
+            if user is not None:
+                self._cache.pop(("id", user["id"]))
+                self._cache.pop(("email", user["email"].lower()))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+token_cache = TokenCache()
+user_cache = UserCache()
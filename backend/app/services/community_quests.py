@@ -0,0 +1,134 @@
+# backend/app/services/community_quests.py
+"""Community quests: one shared goal advanced by every player.
+
+A community quest is a ``Quest`` with ``quest_type`` ``"community"``. Its
+``requirements`` are goals for the whole community, e.g.
+``{"pushups": 1000000}``. Each requirement is a sharded counter named
+``quest:<quest_id>:<exercise_id>``, so exercise logs never write to the
+quest document itself. The quest's ``is_completed`` flips the first time
+every requirement has reached its target, through a conditional update,
+so completion is recorded exactly once.
+"""
+from datetime import datetime
+from typing import Any, Dict, List
+import os
+import time
+import logging
+from dotenv import load_dotenv
+from ..services.database import get_database
+from ..services.quest_service import progress_amount
+from ..services.sharded_counter import counters
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COMMUNITY_QUEST_TYPE = "community"
+COMMUNITY_QUEST_REFRESH_INTERVAL = float(os.getenv("COMMUNITY_QUEST_REFRESH_INTERVAL", 60))
+
+
+def counter_name(quest_id: str, exercise_id: str) -> str:
+    return f"quest:{quest_id}:{exercise_id}"
+
+
+class CommunityQuestTracker:
+    def __init__(self, refresh_interval: float = COMMUNITY_QUEST_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._by_exercise: Dict[str, List[str]] = {}
+        self._counter_quests: Dict[str, str] = {}  # counter name -> quest id
+        self._quests: Dict[str, dict] = {}  # active quest id -> requirements
+        self._ids: Dict[str, Any] = {}  # quest id -> stored _id (ObjectId or string)
+        self._loaded_at = None
+        self.completed = 0
+
+    async def refresh(self):
+        """Reload active community quests and watch their requirement counters"""
+        quests = await get_database().quests.find(
+            {"quest_type": COMMUNITY_QUEST_TYPE, "is_completed": {"$ne": True}},
+            {"requirements": 1}
+        ).to_list(None)
+
+        by_exercise: Dict[str, List[str]] = {}
+        counter_quests: Dict[str, str] = {}
+        active, ids = {}, {}
+        for quest in quests:
+            quest_id = str(quest["_id"])
+            ids[quest_id] = quest["_id"]
+            active[quest_id] = quest.get("requirements") or {}
+            for exercise_id, target in active[quest_id].items():
+                name = counter_name(quest_id, exercise_id)
+                by_exercise.setdefault(exercise_id, []).append(name)
+                counter_quests[name] = quest_id
+                counters.watch(name, target, self._requirement_met)
+        for quest_id in self._quests.keys() - active.keys():
+            for exercise_id in self._quests[quest_id]:
+                counters.unwatch(counter_name(quest_id, exercise_id))
+
+        self._by_exercise, self._counter_quests, self._quests = by_exercise, counter_quests, active
+        self._ids = ids
+        self._loaded_at = time.monotonic()
+
+        # Catches completions interrupted between the threshold firing and the quest update
+        totals = await counters.exact_totals(counter_quests) if counter_quests else {}
+        for quest_id, requirements in active.items():
+            if requirements and all(
+                totals[counter_name(quest_id, exercise_id)] >= target
+                for exercise_id, target in requirements.items()
+            ):
+                await self._complete(quest_id)
+
+    async def record_progress(self, logs: List[dict]):
+        """Count a batch of stored exercise logs towards active community quests"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            await self.refresh()
+        for log in logs:
+            for name in self._by_exercise.get(log["exercise_id"], ()):
+                counters.add(name, progress_amount(log))
+
+    async def _requirement_met(self, name: str, total: int):
+        quest_id = self._counter_quests[name]
+        names = {
+            counter_name(quest_id, exercise_id): target
+            for exercise_id, target in self._quests[quest_id].items()
+        }
+        # Exact sums; the last requirement to finish sees all the others finished
+        totals = await counters.exact_totals(names)
+        if all(totals[n] >= target for n, target in names.items()):
+            await self._complete(quest_id)
+
+    async def _complete(self, quest_id: str):
+        result = await get_database().quests.update_one(
+            {"_id": self._ids.get(quest_id, quest_id), "is_completed": {"$ne": True}},
+            {"$set": {"is_completed": True, "completed_at": datetime.utcnow()}}
+        )
+        if result.modified_count == 1:
+            self.completed += 1
+            logger.info(f"Community quest {quest_id} completed")
+
+    async def get_quests(self) -> List[dict]:
+        """Community quests with their progress, from cached counter totals"""
+        quests = await get_database().quests.find({"quest_type": COMMUNITY_QUEST_TYPE}).to_list(None)
+        names = [
+            counter_name(str(quest["_id"]), exercise_id)
+            for quest in quests for exercise_id in quest.get("requirements") or {}
+        ]
+        totals = await counters.totals(names) if names else {}
+        results = []
+        for quest in quests:
+            quest_id = str(quest.pop("_id"))
+            quest["id"] = quest_id
+            quest["progress"] = {
+                exercise_id: {"count": min(totals[counter_name(quest_id, exercise_id)], target), "target": target}
+                for exercise_id, target in (quest.get("requirements") or {}).items()
+            }
+            results.append(quest)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._quests),
+            "completed": self.completed,
+        }
+
+
+community_quests = CommunityQuestTracker()
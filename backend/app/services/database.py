@@ -1,55 +1,235 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+import asyncio
 import os
+import socket
+import time
 from dotenv import load_dotenv
 import traceback
 
 load_dotenv()
 
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "singularity_local")
+INDEX_LEASE_SECONDS = int(os.getenv("INDEX_LEASE_SECONDS", 300))
+
+# (collection, keys, options) for every index the application relies on
+INDEX_SPECS = [
+    # User indexes
+    ("users", [("email", 1)], {"unique": True}),
+    ("users", [("username", 1)], {"unique": True}),
+
+    # Exercise log indexes
+    # (user_id, completed_at) range scans and keyset pagination on (completed_at, _id)
+    ("exercise_logs", [("user_id", 1), ("completed_at", 1), ("_id", 1)], {}),
+    ("exercise_logs", [("completed_at", 1)], {}),
+
+    # Progress analytics rollups
+    ("exercise_rollups", [("user_id", 1), ("period", 1), ("start", 1)], {}),
+
+    # Per-user collections split out of the user document
+    ("user_inventory", [("user_id", 1)], {}),
+    # At most one equipped item per slot
+    ("user_inventory", [("user_id", 1), ("slot", 1)], {
+        "unique": True, "partialFilterExpression": {"equipped": True, "slot": {"$exists": True}}
+    }),
+    # Repeatable quests get one row per period; period is null for the others
+    ("user_quests", [("user_id", 1), ("quest_id", 1), ("period", 1)], {"unique": True}),
+    ("user_quests", [("user_id", 1), ("status", 1)], {}),
+
+    # Quest engine: requirement entries looked up by the exercise that advances them
+    ("quest_progress", [("user_id", 1), ("exercise_id", 1), ("done", 1)], {}),
+    ("quest_progress", [("user_id", 1), ("quest_id", 1)], {}),
+
+    # Sharded counters (community quests) are summed by counter name
+    ("counter_shards", [("counter", 1)], {}),
+
+    # Shared rate limiter state; idle keys expire on their own
+    ("rate_limits", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+
+    # Revoked JWT ids, kept until the token would have expired anyway
+    ("revoked_tokens", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("revoked_tokens", [("revoked_at", 1)], {}),
+]
+
+# Indexes that were replaced and get in the way of the ones above
+OBSOLETE_INDEXES = [
+    # Unique per (user, quest); superseded by the per-period key
+    ("user_quests", [("user_id", 1), ("quest_id", 1)]),
+    # Prefix of the (user_id, completed_at, _id) index
+    ("exercise_logs", [("user_id", 1)]),
+]
+
 class MongoDB:
     client: AsyncIOMotorClient = None
     database = None
+    ready: bool = False
+    ready_at: float = None
+    indexes_created: int = 0
+    # "<collection>.<index> {option: expected}" for indexes that differ from INDEX_SPECS
+    index_drift: list = []
 
 mongodb = MongoDB()
 
+def open_mongo_client():
+    """Create the client without waiting for the server.
+
+    Motor connects lazily, so this returns immediately; ``mongodb.ready``
+    flips once ``initialize_database`` has reached the server.
+    """
+    mongodb.client = AsyncIOMotorClient(MONGODB_URL, serverSelectionTimeoutMS=3000)
+    mongodb.database = mongodb.client[DATABASE_NAME]
+    mongodb.ready = False
+
 async def connect_to_mongo():
     try:
         # Simple local connection
-        mongodb.client = AsyncIOMotorClient(
-            os.getenv("MONGODB_URL", "mongodb://localhost:27017"),
-            serverSelectionTimeoutMS=3000
-        )
-        
+        open_mongo_client()
+
         # Test connection
         await mongodb.client.admin.command('ping')
-        
-        mongodb.database = mongodb.client[os.getenv("DATABASE_NAME", "singularity_local")]
-        print(f"✅ Connected to MongoDB: {os.getenv('DATABASE_NAME', 'singularity_local')}")
-        
+        mongodb.ready = True
+        print(f"✅ Connected to MongoDB: {DATABASE_NAME}")
+
         # Create indexes for better performance
         await create_indexes()
-        
+
     except Exception as e:
+        mongodb.database = None
         print(f"❌ MongoDB connection failed: {e}")
-        traceback.print_exc() 
+        traceback.print_exc()
         print("📝 Make sure MongoDB is running on localhost:27017")
         # Don't raise exception - let the app start without DB for testing
         print("⚠️  App will continue without database connection")
 
+async def initialize_database(retry_delay: float = 1.0, max_delay: float = 30.0):
+    """Background startup: wait for the server, then reconcile indexes once.
+
+    Only the worker holding the index lease reconciles, so a fleet of
+    workers booting together does not repeat the same index checks.
+    """
+    delay = retry_delay
+    while True:
+        try:
+            await mongodb.client.admin.command('ping')
+            break
+        except Exception as e:
+            print(f"⏳ MongoDB not reachable yet ({e}); retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    mongodb.ready = True
+    mongodb.ready_at = time.time()
+    print(f"✅ Connected to MongoDB: {DATABASE_NAME}")
+
+    if await acquire_lease("index_reconcile", INDEX_LEASE_SECONDS):
+        try:
+            await create_indexes()
+        finally:
+            # The TTL only matters if this worker dies mid-reconcile
+            await release_lease("index_reconcile")
+    else:
+        print("📊 Index reconciliation is running on another worker")
+        await check_indexes()
+
+async def acquire_lease(name: str, ttl_seconds: int) -> bool:
+    """Take (or renew) a named lease in the ``locks`` collection"""
+    db = get_database()
+    owner = _lease_owner()
+    now = datetime.utcnow()
+    try:
+        await db.locks.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def release_lease(name: str):
+    """Give up a lease this process holds, so the next worker does not wait for the TTL"""
+    try:
+        await get_database().locks.delete_one({"_id": name, "owner": _lease_owner()})
+    except Exception as e:
+        print(f"⚠️  Could not release lease {name}: {e}")
+
+def _lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+async def reconcile_indexes(db) -> int:
+    """Drop OBSOLETE_INDEXES, then create the INDEX_SPECS indexes that do not exist yet"""
+    collections = sorted(
+        {collection for collection, _, _ in INDEX_SPECS} | {collection for collection, _ in OBSOLETE_INDEXES}
+    )
+
+    existing = await _existing_indexes(db, collections)
+    missing = [
+        (collection, keys, options) for collection, keys, options in INDEX_SPECS
+        if tuple(keys) not in existing[collection]
+    ]
+
+    obsolete = [
+        (collection, existing[collection][tuple(keys)]["name"])
+        for collection, keys in OBSOLETE_INDEXES if tuple(keys) in existing.get(collection, {})
+    ]
+    for collection, name in obsolete:
+        print(f"🧹 Dropping obsolete index {collection}.{name}")
+    await asyncio.gather(*(db[collection].drop_index(name) for collection, name in obsolete))
+
+    await asyncio.gather(*(
+        db[collection].create_index(keys, **options) for collection, keys, options in missing
+    ))
+    return len(missing)
+
+async def _existing_indexes(db, collections) -> dict:
+    """``{collection: {key tuple: index info}}``; empty for missing collections"""
+    async def existing_indexes(collection):
+        indexes = {}
+        try:
+            async for index in db[collection].list_indexes():
+                indexes[tuple(index["key"].items())] = index
+        except Exception:
+            pass  # collection does not exist yet
+        return collection, indexes
+
+    return dict(await asyncio.gather(*(existing_indexes(c) for c in collections)))
+
+async def find_index_drift(db) -> list:
+    """Existing indexes whose options differ from INDEX_SPECS.
+
+    These are never changed automatically, since rebuilding one (making
+    ``users.username_1`` unique, for instance) can fail on existing data;
+    see ``app.commands.migrate_unique_usernames``.
+    """
+    existing = await _existing_indexes(db, sorted({collection for collection, _, _ in INDEX_SPECS}))
+    drift = []
+    for collection, keys, options in INDEX_SPECS:
+        index = existing[collection].get(tuple(keys))
+        if index is not None:
+            drifted = {k: v for k, v in options.items() if index.get(k) != v}
+            if drifted:
+                drift.append(f"{collection}.{index['name']} {drifted}")
+    return drift
+
+async def check_indexes() -> list:
+    """Record index drift in ``mongodb.index_drift``; the API reports not ready while any remains"""
+    mongodb.index_drift = await find_index_drift(mongodb.database)
+    for drift in mongodb.index_drift:
+        print(f"❌ Index {drift} differs from spec; unique constraints are NOT enforced. "
+              f"Run python -m app.commands.migrate_unique_usernames")
+    return mongodb.index_drift
+
 async def create_indexes():
     """Create database indexes for better performance"""
     try:
-        db = mongodb.database
-        
-        # User indexes
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index("username")
-        
-        # Exercise log indexes
-        await db.exercise_logs.create_index("user_id")
-        await db.exercise_logs.create_index("completed_at")
-        
-        print("📊 Database indexes created")
-        
+        started = time.perf_counter()
+        mongodb.indexes_created = await reconcile_indexes(mongodb.database)
+        print(f"📊 Database indexes reconciled: {mongodb.indexes_created} created "
+              f"in {time.perf_counter() - started:.2f}s")
+        await check_indexes()
+
     except Exception as e:
         print(f"⚠️  Index creation failed: {e}")
 
@@ -61,4 +241,4 @@ async def close_mongo_connection():
 def get_database():
     if mongodb.database is None:
         raise Exception("Database not connected. Please start MongoDB and restart the server.")
-    return mongodb.database
\ No newline at end of file
+    return mongodb.database
@@ -0,0 +1,107 @@
+# backend/app/services/energy.py
+"""Energy regeneration, computed on read.
+
+Stored ``energy`` is only the balance as of ``last_energy_update``; the
+current value adds one ``ENERGY_REGEN_AMOUNT`` per elapsed
+``ENERGY_REGEN_INTERVAL_SECONDS`` up to ``max_energy``. Nothing is written
+until energy is spent.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ENERGY_REGEN_INTERVAL_SECONDS = int(os.getenv("ENERGY_REGEN_INTERVAL_SECONDS", 180))
+ENERGY_REGEN_AMOUNT = int(os.getenv("ENERGY_REGEN_AMOUNT", 1))
+DEFAULT_MAX_ENERGY = 100
+
+
+class InsufficientEnergy(Exception):
+    """Raised when a user does not have enough energy to spend"""
+    pass
+
+
+def regenerate(energy: int, max_energy: int, last_update: Optional[datetime],
+               now: datetime) -> tuple[int, datetime]:
+    """Return ``(current_energy, regen_clock)`` as of ``now``.
+
+    The regen clock only advances by whole intervals so partial progress
+    towards the next point is kept, except at the cap where it resets.
+    """
+    if last_update is None or energy >= max_energy:
+        return min(energy, max_energy), now
+
+    interval = timedelta(seconds=ENERGY_REGEN_INTERVAL_SECONDS)
+    ticks = max(int((now - last_update) / interval), 0)
+    current = energy + ticks * ENERGY_REGEN_AMOUNT
+    if current >= max_energy:
+        return max_energy, now
+    return current, last_update + ticks * interval
+
+
+def with_current_energy(user: dict, now: Optional[datetime] = None) -> dict:
+    """Copy of ``user`` with ``energy`` regenerated up to ``now``"""
+    if "energy" not in user:
+        return user
+    current, _ = regenerate(
+        user["energy"],
+        user.get("max_energy", DEFAULT_MAX_ENERGY),
+        user.get("last_energy_update"),
+        now or datetime.utcnow()
+    )
+    return {**user, "energy": current}
+
+
+def _regen_expression(now: datetime) -> dict:
+    interval_ms = ENERGY_REGEN_INTERVAL_SECONDS * 1000
+    ticks = {"$floor": {"$divide": [
+        {"$max": [{"$subtract": [now, {"$ifNull": ["$last_energy_update", now]}]}, 0]},
+        interval_ms,
+    ]}}
+    return {
+        "ticks": ticks,
+        "energy": {"$min": [
+            {"$ifNull": ["$max_energy", DEFAULT_MAX_ENERGY]},
+            {"$add": ["$energy", {"$multiply": [ticks, ENERGY_REGEN_AMOUNT]}]},
+        ]},
+    }
+
+
+def spend_energy_filter(amount: int, now: datetime) -> dict:
+    """Match only users whose regenerated balance covers ``amount``"""
+    return {"$expr": {"$gte": [_regen_expression(now)["energy"], amount]}}
+
+
+def spend_energy_pipeline(amount: int, now: datetime) -> list:
+    """Update pipeline that regenerates, then spends ``amount`` energy"""
+    return _change_energy_pipeline(-amount, now)
+
+
+def refund_energy_pipeline(amount: int, now: datetime) -> list:
+    """Update pipeline that regenerates, then gives back ``amount`` energy up to ``max_energy``"""
+    return _change_energy_pipeline(amount, now)
+
+
+def _change_energy_pipeline(delta: int, now: datetime) -> list:
+    regen = _regen_expression(now)
+    interval_ms = ENERGY_REGEN_INTERVAL_SECONDS * 1000
+    return [
+        {"$set": {"_ticks": regen["ticks"], "_regen": regen["energy"]}},
+        {"$set": {
+            "last_energy_update": {"$cond": [
+                {"$gte": ["$_regen", {"$ifNull": ["$max_energy", DEFAULT_MAX_ENERGY]}]},
+                now,
+                {"$add": [
+                    {"$ifNull": ["$last_energy_update", now]},
+                    {"$multiply": ["$_ticks", interval_ms]},
+                ]},
+            ]},
+            "energy": {"$min": [
+                {"$ifNull": ["$max_energy", DEFAULT_MAX_ENERGY]},
+                {"$add": ["$_regen", delta]},
+            ]},
+        }},
+        {"$project": {"_ticks": 0, "_regen": 0}},
+    ]
@@ -0,0 +1,251 @@
+# backend/app/services/equipment.py
+"""Equipping inventory items and the effective stats they produce.
+
+Users keep base ``attributes`` plus a denormalized ``effective_attributes``
+field holding base attributes plus the bonuses of every equipped item, so
+reading a user's effective stats is a single field lookup no matter how
+large the inventory is.
+
+Equipping flips ``equipped`` on the ``user_inventory`` entry with a
+conditional update, then applies the bonus to the user. That second write
+records the entry in ``equipment_bonuses`` in the same update as the
+``$inc`` on ``effective_attributes``, and only applies when the entry is
+not recorded yet, so the user document always says exactly which bonuses
+its effective stats include. Unequipping removes the recorded bonus the
+same way. If the user write fails, the inventory flag is rolled back; if
+the process dies between the two writes, ``reconcile`` (run on every
+equipment change and inventory read) fixes the difference. A partial
+unique index on ``(user_id, slot)`` allows one equipped item per slot.
+Stat grants keep ``effective_attributes`` in step inside
+``stats_update_pipeline``.
+
+Users created before these fields existed get them materialized from
+their equipped items the first time their equipment is read or changed.
+"""
+from typing import Dict, Iterable, List, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+import os
+import logging
+from dotenv import load_dotenv
+from ..services.cache import TTLCache
+from ..services.database import get_database
+from ..services.user_repository import get_user_repository
+from ..services.auth_cache import user_cache
+from ..services.leveling import ATTRIBUTES
+from ..services.metrics import span
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ITEM_CACHE_MAX_SIZE = int(os.getenv("ITEM_CACHE_MAX_SIZE", 5000))
+ITEM_CACHE_TTL_SECONDS = float(os.getenv("ITEM_CACHE_TTL_SECONDS", 300))
+
+# item_type -> slot; other item types (potions) cannot be equipped
+EQUIPMENT_SLOTS = {"weapon": "weapon", "armor": "armor"}
+
+
+class EquipmentServiceError(Exception):
+    """Custom exception for equipment service errors"""
+    pass
+
+
+def item_bonus(item: dict) -> Dict[str, int]:
+    """The attribute bonuses an item grants while equipped"""
+    attributes = item.get("attributes") or {}
+    return {attr: attributes[attr] for attr in ATTRIBUTES if attributes.get(attr)}
+
+
+def _object_id(value: str):
+    """``_id`` for a string id: ObjectId when it parses as one, otherwise the string itself"""
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+class ItemCache:
+    """Item definitions by id, LRU-bounded and refreshed after a TTL"""
+
+    def __init__(self, maxsize: int = ITEM_CACHE_MAX_SIZE, ttl: float = ITEM_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get_many(self, item_ids: Iterable[str]) -> Dict[str, dict]:
+        """Definitions for the ids that exist; one query for all cache misses"""
+        items, missing = {}, set()
+        for item_id in item_ids:
+            item = self._cache.get(item_id)
+            if item is None:
+                missing.add(item_id)
+            else:
+                items[item_id] = item
+        if missing:
+            async for doc in get_database().items.find({"_id": {"$in": [_object_id(item_id) for item_id in missing]}}):
+                doc["id"] = str(doc.pop("_id"))
+                self._cache.set(doc["id"], doc)
+                items[doc["id"]] = doc
+        return items
+
+    async def get(self, item_id: str) -> Optional[dict]:
+        return (await self.get_many([item_id])).get(item_id)
+
+    def invalidate(self, item_id: Optional[str] = None):
+        if item_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(item_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+item_cache = ItemCache()
+
+
+class EquipmentService:
+    @staticmethod
+    async def get_inventory(user_id: str) -> List[dict]:
+        """Inventory entries with their item definitions"""
+        await EquipmentService.reconcile(user_id)
+        entries = await get_database().user_inventory.find({"user_id": user_id}).to_list(None)
+        items = await item_cache.get_many({entry["item_id"] for entry in entries})
+        return [
+            {
+                "id": str(entry["_id"]),
+                "item_id": entry["item_id"],
+                "equipped": bool(entry.get("equipped")),
+                "item": items.get(entry["item_id"]),
+            }
+            for entry in entries
+        ]
+
+    @staticmethod
+    async def get_effective_attributes(user_id: str) -> Dict[str, int]:
+        projection = {"effective_attributes": 1, "equipment_bonuses": 1}
+        with span("db"):
+            user = await get_user_repository().find_by_id(user_id, projection)
+        if user is None:
+            raise EquipmentServiceError("User not found")
+        if "equipment_bonuses" not in user:
+            await EquipmentService.reconcile(user_id)
+            user = await get_user_repository().find_by_id(user_id, projection)
+        return user["effective_attributes"]
+
+    @staticmethod
+    async def reconcile(user_id: str):
+        """Bring ``effective_attributes`` in line with the equipped inventory.
+
+        Repairs an equip or unequip interrupted between its two writes, and
+        materializes the fields for users that predate them. Every step is
+        conditional on ``equipment_bonuses``, so running it concurrently
+        with an equip or another reconcile never applies a bonus twice.
+        """
+        repository = get_user_repository()
+        user = await repository.find_by_id(user_id, {"equipment_bonuses": 1})
+        if user is None:
+            return
+        equipped = await get_database().user_inventory.find(
+            {"user_id": user_id, "equipped": True}, {"item_id": 1, "bonus": 1}
+        ).to_list(None)
+        items = await item_cache.get_many({e["item_id"] for e in equipped if "bonus" not in e})
+        wanted = {
+            str(entry["_id"]): entry["bonus"] if "bonus" in entry
+            else item_bonus(items.get(entry["item_id"]) or {})
+            for entry in equipped
+        }
+
+        if "equipment_bonuses" not in user:
+            if await repository.init_effective_attributes(user_id, wanted):
+                logger.info(f"Materialized effective attributes for user {user_id}")
+            return
+        applied = user["equipment_bonuses"]
+        repaired = 0
+        for entry_id, bonus in wanted.items():
+            if entry_id not in applied:
+                repaired += await repository.apply_equipment_bonus(user_id, entry_id, bonus)
+        for entry_id in applied.keys() - wanted.keys():
+            repaired += await repository.remove_equipment_bonus(user_id, entry_id)
+        if repaired:
+            user_cache.invalidate(user_id=user_id)
+            logger.warning(f"Reconciled {repaired} equipment bonuses for user {user_id}")
+
+    @staticmethod
+    async def equip(user_id: str, inventory_id: str) -> Dict[str, int]:
+        """Equip an inventory entry, replacing whatever holds its slot"""
+        db = get_database()
+        entry = await db.user_inventory.find_one({"_id": _object_id(inventory_id), "user_id": user_id})
+        if not entry:
+            raise EquipmentServiceError("Item not found")
+        if entry.get("equipped"):
+            raise EquipmentServiceError("Item already equipped")
+        item = await item_cache.get(entry["item_id"])
+        if not item:
+            raise EquipmentServiceError("Unknown item")
+        slot = EQUIPMENT_SLOTS.get(item.get("item_type"))
+        if slot is None:
+            raise EquipmentServiceError("Item cannot be equipped")
+
+        await EquipmentService.reconcile(user_id)
+        bonus = item_bonus(item)
+        for _ in range(2):
+            try:
+                result = await db.user_inventory.update_one(
+                    {"_id": entry["_id"], "user_id": user_id, "equipped": {"$ne": True}},
+                    {"$set": {"equipped": True, "slot": slot, "bonus": bonus}}
+                )
+                break
+            except DuplicateKeyError:
+                # The slot is taken; take the current item off and try again
+                holder = await db.user_inventory.find_one(
+                    {"user_id": user_id, "slot": slot, "equipped": True}, {"_id": 1}
+                )
+                if holder:
+                    await EquipmentService._unequip(user_id, holder["_id"])
+        else:
+            raise EquipmentServiceError("Slot is busy")
+        if result.modified_count != 1:
+            raise EquipmentServiceError("Item already equipped")
+
+        try:
+            with span("db"):
+                await get_user_repository().apply_equipment_bonus(user_id, str(entry["_id"]), bonus)
+        except Exception as e:
+            logger.error(f"Could not apply equipment bonus for user {user_id}: {e}")
+            await db.user_inventory.update_one(
+                {"_id": entry["_id"], "equipped": True},
+                {"$set": {"equipped": False}, "$unset": {"slot": "", "bonus": ""}}
+            )
+            raise EquipmentServiceError("Could not equip item")
+        user_cache.invalidate(user_id=user_id)
+        return await EquipmentService.get_effective_attributes(user_id)
+
+    @staticmethod
+    async def unequip(user_id: str, inventory_id: str) -> Dict[str, int]:
+        await EquipmentService.reconcile(user_id)
+        if not await EquipmentService._unequip(user_id, _object_id(inventory_id)):
+            raise EquipmentServiceError("Item not equipped")
+        return await EquipmentService.get_effective_attributes(user_id)
+
+    @staticmethod
+    async def _unequip(user_id: str, entry_id) -> bool:
+        db = get_database()
+        entry = await db.user_inventory.find_one_and_update(
+            {"_id": entry_id, "user_id": user_id, "equipped": True},
+            {"$set": {"equipped": False}, "$unset": {"slot": "", "bonus": ""}},
+            projection={"slot": 1, "bonus": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if entry is None:
+            return False
+        try:
+            with span("db"):
+                await get_user_repository().remove_equipment_bonus(user_id, str(entry_id))
+        except Exception as e:
+            logger.error(f"Could not remove equipment bonus for user {user_id}: {e}")
+            restore = {"equipped": True, **{k: entry[k] for k in ("slot", "bonus") if k in entry}}
+            try:
+                await db.user_inventory.update_one({"_id": entry_id, "equipped": False}, {"$set": restore})
+            except DuplicateKeyError:
+                pass  # the slot was refilled meanwhile; the next reconcile removes the bonus
+            raise EquipmentServiceError("Could not unequip item")
+        user_cache.invalidate(user_id=user_id)
+        return True
@@ -0,0 +1,184 @@
+# backend/app/services/exercise_catalog.py
+"""Immutable in-memory exercise catalog.
+
+The catalog is loaded from the ``exercises`` collection (or from a JSON
+file when ``EXERCISE_CATALOG_PATH`` is set) into a frozen snapshot indexed
+by id and by exercise type. A reload builds a complete new snapshot and
+swaps it in with a single attribute assignment, so readers never lock and
+never see a half-built catalog. Each snapshot carries a content hash as its
+version; identical reloads are no-ops.
+
+Reloads are triggered by a MongoDB change stream when the deployment
+supports one (``EXERCISE_CATALOG_RELOAD=watch``), otherwise by polling every
+``EXERCISE_CATALOG_POLL_INTERVAL`` seconds.
+"""
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+from pydantic import ValidationError
+import asyncio
+import hashlib
+import json
+import os
+import time
+import logging
+from dotenv import load_dotenv
+from ..models.exercise import Exercise
+from ..services.database import get_database
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EXERCISE_CATALOG_PATH = os.getenv("EXERCISE_CATALOG_PATH")  # JSON list; overrides MongoDB
+EXERCISE_CATALOG_RELOAD = os.getenv("EXERCISE_CATALOG_RELOAD", "watch")  # "watch", "poll" or "off"
+EXERCISE_CATALOG_POLL_INTERVAL = float(os.getenv("EXERCISE_CATALOG_POLL_INTERVAL", 60))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: str
+    loaded_at: float
+    by_id: Mapping[str, Mapping] = field(default_factory=lambda: MappingProxyType({}))
+    by_type: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: MappingProxyType({}))
+
+
+def build_snapshot(documents: Iterable[dict]) -> CatalogSnapshot:
+    """Validate raw exercise documents into a frozen, versioned snapshot"""
+    entries = {}
+    for doc in documents:
+        doc = dict(doc)
+        if "_id" in doc:
+            doc["id"] = str(doc.pop("_id"))
+        try:
+            exercise = Exercise(**doc)
+        except ValidationError as e:
+            logger.warning(f"Skipping invalid exercise {doc.get('id')}: {e.error_count()} errors")
+            continue
+        entries[exercise.id] = exercise.model_dump(mode="json")
+
+    canonical = json.dumps([entries[k] for k in sorted(entries)], sort_keys=True)
+    by_type: Dict[str, list] = {}
+    for exercise_id in sorted(entries):
+        by_type.setdefault(entries[exercise_id]["exercise_type"], []).append(exercise_id)
+
+    return CatalogSnapshot(
+        version=hashlib.sha256(canonical.encode()).hexdigest()[:16],
+        loaded_at=time.time(),
+        by_id=MappingProxyType({k: MappingProxyType(v) for k, v in entries.items()}),
+        by_type=MappingProxyType({k: tuple(v) for k, v in by_type.items()}),
+    )
+
+
+class ExerciseCatalog:
+    def __init__(self, path: Optional[str] = EXERCISE_CATALOG_PATH,
+                 reload_mode: str = EXERCISE_CATALOG_RELOAD,
+                 poll_interval: float = EXERCISE_CATALOG_POLL_INTERVAL):
+        self.path = path
+        self.reload_mode = reload_mode
+        self.poll_interval = poll_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+        self.swaps = 0
+
+    # Lookups: read the current snapshot once, never lock ---------------------
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    def get(self, exercise_id: str) -> Optional[Mapping]:
+        snapshot = self._snapshot
+        return snapshot.by_id.get(exercise_id) if snapshot else None
+
+    def resolve(self, exercise_ids: Iterable[str]) -> Dict[str, Mapping]:
+        """Definitions for every known id in ``exercise_ids``, from one snapshot"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {}
+        by_id = snapshot.by_id
+        return {exercise_id: by_id[exercise_id] for exercise_id in set(exercise_ids) if exercise_id in by_id}
+
+    def ids_by_type(self, exercise_type: str) -> Tuple[str, ...]:
+        snapshot = self._snapshot
+        return snapshot.by_type.get(exercise_type, ()) if snapshot else ()
+
+    def all(self) -> Tuple[Mapping, ...]:
+        snapshot = self._snapshot
+        return tuple(snapshot.by_id.values()) if snapshot else ()
+
+    # Loading ------------------------------------------------------------------
+
+    async def _read_documents(self) -> list:
+        if self.path:
+            with open(self.path) as f:
+                return json.load(f)
+        return await get_database().exercises.find({}).to_list(None)
+
+    async def reload(self) -> bool:
+        """Load a fresh snapshot and swap it in; returns True if it changed"""
+        snapshot = build_snapshot(await self._read_documents())
+        self.reloads += 1
+        if self._snapshot is not None and self._snapshot.version == snapshot.version:
+            return False
+        self._snapshot = snapshot
+        self.swaps += 1
+        logger.info(f"Exercise catalog v{snapshot.version} loaded ({len(snapshot.by_id)} exercises)")
+        return True
+
+    async def _watch(self):
+        async with get_database().exercises.watch() as stream:
+            async for _ in stream:
+                await self.reload()
+
+    async def _run(self):
+        if self.reload_mode == "watch" and not self.path:
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"Exercise change stream unavailable ({e}); polling instead")
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.warning(f"Exercise catalog reload failed: {e}")
+
+    async def start(self):
+        """Load the catalog, then keep it fresh in the background"""
+        try:
+            await self.reload()
+        finally:
+            # A failed first load is retried by the background reloads
+            if self._task is None and self.reload_mode != "off":
+                self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "exercises": len(snapshot.by_id) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else 0,
+            "reloads": self.reloads,
+            "swaps": self.swaps,
+        }
+
+
+exercise_catalog = ExerciseCatalog()
@@ -0,0 +1,225 @@
+# backend/app/services/exercise_ingestion.py
+from collections import defaultdict
+from typing import List, Optional, Tuple
+from pymongo.errors import BulkWriteError
+import asyncio
+import os
+import time
+import logging
+from dotenv import load_dotenv
+from ..services.database import get_database
+from ..services.user_service import UserService
+from ..services.quest_service import QuestService
+from ..services.community_quests import community_quests
+from ..services.analytics import AnalyticsService
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+INGEST_FLUSH_SIZE = int(os.getenv("INGEST_FLUSH_SIZE", 500))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", 1.0))
+INGEST_MAX_BUFFER = int(os.getenv("INGEST_MAX_BUFFER", 10000))
+INGEST_PUT_TIMEOUT = float(os.getenv("INGEST_PUT_TIMEOUT", 2.0))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", 5))
+INGEST_RETRY_DELAY = float(os.getenv("INGEST_RETRY_DELAY", 1.0))
+
+
+class IngestionBusy(Exception):
+    """Raised when the write-behind buffer stays full past the put timeout"""
+    pass
+
+
+class ExerciseLogIngestor:
+    """Write-behind buffer for exercise logs.
+
+    Request handlers append ready-to-insert log documents; a single
+    background task flushes them with ``insert_many(ordered=False)`` and
+    applies one aggregated stat grant per user per flush.
+
+    A batch whose insert fails outright (the server is unreachable, a
+    timeout) is requeued and retried with exponential backoff, up to
+    ``max_retries`` times, before it is dropped. Logs carry their ``_id``
+    from the start, so on a retry a duplicate key means the earlier attempt
+    already stored that log. Retried batches count towards ``max_buffer``.
+    """
+
+    def __init__(self, flush_size: int = INGEST_FLUSH_SIZE,
+                 flush_interval: float = INGEST_FLUSH_INTERVAL,
+                 max_buffer: int = INGEST_MAX_BUFFER,
+                 put_timeout: float = INGEST_PUT_TIMEOUT,
+                 max_retries: int = INGEST_MAX_RETRIES,
+                 retry_delay: float = INGEST_RETRY_DELAY):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._buffer: List[dict] = []
+        # (attempts so far, monotonic time it is due, batch)
+        self._retries: List[Tuple[int, float, List[dict]]] = []
+        self._retrying = 0
+        self._space: Optional[asyncio.Condition] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.inserted = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.quests_completed = 0
+        self.rollup_failures = 0
+
+    async def submit(self, logs: List[dict]):
+        """Buffer a batch of log documents, waiting briefly for room"""
+        if len(logs) > self.max_buffer:
+            raise ValueError("Batch is larger than the ingestion buffer")
+        if self._space is None or self._stopping:
+            raise IngestionBusy("Ingestion is not running")
+
+        async with self._space:
+            try:
+                await asyncio.wait_for(
+                    self._space.wait_for(
+                        lambda: len(self._buffer) + self._retrying + len(logs) <= self.max_buffer
+                    ),
+                    self.put_timeout
+                )
+            except asyncio.TimeoutError:
+                self.rejected += len(logs)
+                raise IngestionBusy("Ingestion buffer is full")
+
+            self._buffer.extend(logs)
+            if len(self._buffer) >= self.flush_size:
+                self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            await self._flush_pending()
+            await self._flush_retries(force=self._stopping)
+            if self._stopping:
+                return
+
+    async def _flush_pending(self):
+        async with self._space:
+            pending, self._buffer = self._buffer, []
+            self._space.notify_all()
+
+        for start in range(0, len(pending), self.flush_size):
+            await self._flush(pending[start:start + self.flush_size])
+
+    async def _flush_retries(self, force: bool = False):
+        """Retry the requeued batches that are due (all of them when stopping)"""
+        now = time.monotonic()
+        due = [entry for entry in self._retries if force or entry[1] <= now]
+        if not due:
+            return
+        self._retries = [entry for entry in self._retries if not (force or entry[1] <= now)]
+        for attempts, _, batch in due:
+            self.retried += 1
+            await self._flush(batch, attempts, final=force)
+        async with self._space:
+            self._retrying = sum(len(batch) for _, _, batch in self._retries)
+            self._space.notify_all()
+
+    def _requeue(self, batch: List[dict], attempts: int, final: bool, error: Exception):
+        if final or attempts >= self.max_retries:
+            self.failed += len(batch)
+            self.dropped += len(batch)
+            logger.error(f"Dropping {len(batch)} exercise logs after {attempts + 1} attempts: {error}")
+            return
+        delay = self.retry_delay * 2 ** attempts
+        self._retries.append((attempts + 1, time.monotonic() + delay, batch))
+        self._retrying += len(batch)
+        logger.warning(f"Exercise log flush of {len(batch)} logs failed ({error}); retrying in {delay:.1f}s")
+
+    async def _flush(self, batch: List[dict], attempts: int = 0, final: bool = False):
+        failed_indexes = set()
+        try:
+            db = get_database()
+            await db.exercise_logs.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {
+                error["index"] for error in e.details.get("writeErrors", [])
+                # On a retry, a duplicate _id is a log the failed attempt did store
+                if not (attempts and error.get("code") == 11000)
+            }
+            if failed_indexes:
+                logger.warning(f"{len(failed_indexes)} exercise logs were not inserted")
+        except Exception as e:
+            self._requeue(batch, attempts, final, e)
+            return
+
+        inserted = [log for i, log in enumerate(batch) if i not in failed_indexes]
+        self.inserted += len(inserted)
+        self.failed += len(failed_indexes)
+        self.flushes += 1
+
+        try:
+            await self._apply_stats(inserted)
+        except Exception as e:
+            logger.error(f"Stat update for {len(inserted)} exercise logs failed: {e}")
+        try:
+            self.quests_completed += await QuestService.record_progress(inserted)
+            await community_quests.record_progress(inserted)
+        except Exception as e:
+            logger.error(f"Quest progress update failed: {e}")
+        try:
+            await AnalyticsService.record_logs(inserted)
+        except Exception as e:
+            self.rollup_failures += 1
+            logger.error(f"Exercise rollup update failed: {e}")
+
+    async def _apply_stats(self, logs: List[dict]):
+        experience = defaultdict(int)
+        attributes = defaultdict(lambda: defaultdict(int))
+        for log in logs:
+            experience[log["user_id"]] += log["experience_gained"]
+            for attr, gain in log["attributes_gained"].items():
+                attributes[log["user_id"]][attr] += gain
+
+        for user_id, gained in experience.items():
+            await UserService.update_user_stats(user_id, gained, dict(attributes[user_id]))
+
+    def start(self):
+        if self._task is None:
+            self._space = asyncio.Condition()
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still buffered, then stop the background task"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "retrying": self._retrying,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "quests_completed": self.quests_completed,
+            "rollup_failures": self.rollup_failures,
+        }
+
+
+exercise_ingestor = ExerciseLogIngestor()
@@ -0,0 +1,98 @@
+# backend/app/services/exercise_service.py
+from ..services.database import get_database
+from ..models.exercise import ExerciseLog
+from bson import ObjectId
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import base64
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExerciseServiceError(Exception):
+    """Custom exception for exercise service errors"""
+    pass
+
+
+def calculate_rewards(exercise: dict, entry: dict) -> tuple[int, Dict[str, int]]:
+    """Experience and attribute gains for one logged exercise.
+
+    Effort is one unit per 10 reps (across all sets) plus one per 5 minutes,
+    at least 1, scaled up by 1% per kg of weight moved. Never negative.
+    """
+    sets = entry.get("sets") or 1
+    reps = entry.get("reps") or 0
+    minutes = entry.get("duration_minutes") or 0
+    weight = entry.get("weight_kg") or 0.0
+
+    effort = max(sets * reps / 10 + minutes / 5, 1.0)
+    multiplier = 1 + weight / 100
+    experience = max(0, int(round(exercise["base_exp"] * effort * multiplier)))
+
+    attribute = exercise["exercise_type"]
+    return experience, {attribute: max(1, experience // 50)}
+
+
+def encode_cursor(completed_at: datetime, log_id) -> str:
+    """Opaque keyset cursor for the position after ``(completed_at, log_id)``"""
+    raw = f"{completed_at.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        completed_at, log_id = raw.split("|")
+        return datetime.fromisoformat(completed_at), ObjectId(log_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def to_exercise_log(doc: dict) -> ExerciseLog:
+    return ExerciseLog.model_validate({**doc, "id": str(doc["_id"])})
+
+
+class ExerciseService:
+    @staticmethod
+    async def get_log_page(user_id: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[ExerciseLog], Optional[str]]:
+        """Newest-first page of a user's logs, keyset-paginated on (completed_at, _id)"""
+        query = {"user_id": user_id}
+        if cursor:
+            completed_at, log_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"completed_at": {"$lt": completed_at}},
+                {"completed_at": completed_at, "_id": {"$lt": log_id}},
+            ]
+        
+        try:
+            docs = await get_database().exercise_logs.find(query).sort(
+                [("completed_at", -1), ("_id", -1)]
+            ).limit(limit + 1).to_list(limit + 1)
+        except Exception as e:
+            logger.error(f"Error fetching exercise history: {e}")
+            raise ExerciseServiceError("Database error occurred")
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["completed_at"], docs[-1]["_id"])
+        return [to_exercise_log(doc) for doc in docs], next_cursor
+
+    @staticmethod
+    async def iter_logs(user_id: str, batch_size: int) -> AsyncIterator[List[ExerciseLog]]:
+        """Every log of a user, oldest first, one cursor batch at a time"""
+        cursor = get_database().exercise_logs.find(
+            {"user_id": user_id}, batch_size=batch_size
+        ).sort([("completed_at", 1), ("_id", 1)])
+        try:
+            batch = []
+            async for doc in cursor:
+                batch.append(to_exercise_log(doc))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            await cursor.close()
@@ -0,0 +1,224 @@
+# backend/app/services/leaderboard.py
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
+import time
+import logging
+from dotenv import load_dotenv
+from ..models.user import UserClass
+from ..services.user_repository import get_user_repository
+from ..services.leveling import total_experience
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_RECONCILE_INTERVAL = float(os.getenv("LEADERBOARD_RECONCILE_INTERVAL", 600))
+LEADERBOARD_LOAD_BATCH = int(os.getenv("LEADERBOARD_LOAD_BATCH", 5000))
+
+ATTRIBUTE_METRICS = ("strength", "agility", "vitality", "intelligence")
+METRICS = ("level", "experience") + ATTRIBUTE_METRICS
+GLOBAL_SCOPE = "all"
+SCOPES = (GLOBAL_SCOPE,) + tuple(c.value for c in UserClass)
+
+LEADERBOARD_PROJECTION = {
+    "username": 1, "user_class": 1, "level": 1, "experience": 1, "attributes": 1
+}
+
+
+def user_scores(user: dict) -> Dict[str, int]:
+    attributes = user.get("attributes") or {}
+    scores = {
+        "level": user.get("level", 1),
+        "experience": total_experience(user.get("level", 1), user.get("experience", 0)),
+    }
+    for attr in ATTRIBUTE_METRICS:
+        scores[attr] = attributes.get(attr, 1)
+    return scores
+
+
+def _user_class(user: dict) -> str:
+    user_class = user.get("user_class")
+    return str(getattr(user_class, "value", user_class))
+
+
+class RankedIndex:
+    """Users ordered by descending score, ties broken by user id.
+
+    Keys live in one sorted list so rank lookups are a bisect; updates
+    shift the list in place, which stays cheap into the millions.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, int]] = None):
+        self._scores: Dict[str, int] = dict(entries or {})
+        self._keys: List[Tuple[int, str]] = sorted((-score, uid) for uid, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def upsert(self, user_id: str, score: int):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        self._scores[user_id] = score
+        insort(self._keys, (-score, user_id))
+
+    def remove(self, user_id: str):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """Zero-based rank of the user, or None if not ranked"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, user_id))
+
+    def slice(self, start: int, stop: int) -> List[Tuple[int, str, int]]:
+        start = max(start, 0)
+        return [(start + i, uid, -neg) for i, (neg, uid) in enumerate(self._keys[start:stop])]
+
+
+class Leaderboard:
+    """In-memory ranking per metric, globally and per user class.
+
+    Loaded from MongoDB at startup, kept current by stat updates and
+    rebuilt periodically to correct drift (e.g. writes made by other
+    workers).
+    """
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[str, str], RankedIndex] = {
+            (metric, scope): RankedIndex() for metric in METRICS for scope in SCOPES
+        }
+        self._profiles: Dict[str, dict] = {}
+        self._pending: Optional[Dict[str, dict]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+        self.reconciliations = 0
+
+    def update_user(self, user: dict):
+        """Apply a user's latest stats; needs the LEADERBOARD_PROJECTION fields"""
+        if self._pending is not None:
+            # A rebuild is streaming; replay this update once it swaps in
+            self._pending[user["id"]] = user
+        self._apply(self._indexes, self._profiles, user)
+
+    @staticmethod
+    def _apply(indexes, profiles, user: dict):
+        user_id = user["id"]
+        user_class = _user_class(user)
+        previous = profiles.get(user_id)
+        if previous and previous["user_class"] != user_class:
+            for metric in METRICS:
+                indexes[(metric, previous["user_class"])].remove(user_id)
+
+        profiles[user_id] = {
+            "username": user.get("username"),
+            "user_class": user_class,
+            "level": user.get("level", 1),
+        }
+        for metric, score in user_scores(user).items():
+            indexes[(metric, GLOBAL_SCOPE)].upsert(user_id, score)
+            if (metric, user_class) in indexes:
+                indexes[(metric, user_class)].upsert(user_id, score)
+
+    def remove_user(self, user_id: str):
+        profile = self._profiles.pop(user_id, None)
+        if profile:
+            for metric in METRICS:
+                self._indexes[(metric, GLOBAL_SCOPE)].remove(user_id)
+                if (metric, profile["user_class"]) in self._indexes:
+                    self._indexes[(metric, profile["user_class"])].remove(user_id)
+
+    async def load(self):
+        """Rebuild every index from the users collection and swap it in"""
+        started = time.monotonic()
+        self._pending = {}
+        try:
+            scores = {key: {} for key in self._indexes}
+            profiles = {}
+            users = get_user_repository().iter_users(LEADERBOARD_PROJECTION, LEADERBOARD_LOAD_BATCH)
+            async for user in users:
+                user_id = str(user.pop("_id"))
+                user_class = _user_class(user)
+                profiles[user_id] = {
+                    "username": user.get("username"),
+                    "user_class": user_class,
+                    "level": user.get("level", 1),
+                }
+                for metric, score in user_scores(user).items():
+                    scores[(metric, GLOBAL_SCOPE)][user_id] = score
+                    if (metric, user_class) in scores:
+                        scores[(metric, user_class)][user_id] = score
+
+            indexes = {key: RankedIndex(entries) for key, entries in scores.items()}
+            for user in self._pending.values():
+                self._apply(indexes, profiles, user)
+            self._indexes, self._profiles = indexes, profiles
+        finally:
+            self._pending = None
+
+        self.loaded_at = time.time()
+        logger.info(f"Leaderboard loaded {len(self._profiles)} users in {time.monotonic() - started:.2f}s")
+
+    def _entries(self, rows) -> List[dict]:
+        return [
+            {"rank": rank + 1, "user_id": user_id, "score": score, **self._profiles.get(user_id, {})}
+            for rank, user_id, score in rows
+        ]
+
+    def top(self, metric: str, scope: str = GLOBAL_SCOPE, limit: int = 10) -> List[dict]:
+        return self._entries(self._indexes[(metric, scope)].slice(0, limit))
+
+    def rank(self, metric: str, user_id: str, scope: str = GLOBAL_SCOPE) -> Optional[dict]:
+        index = self._indexes[(metric, scope)]
+        rank = index.rank(user_id)
+        if rank is None:
+            return None
+        entry = self._entries(index.slice(rank, rank + 1))[0]
+        entry["total"] = len(index)
+        return entry
+
+    def around(self, metric: str, user_id: str, scope: str = GLOBAL_SCOPE, radius: int = 5) -> List[dict]:
+        index = self._indexes[(metric, scope)]
+        rank = index.rank(user_id)
+        if rank is None:
+            return []
+        return self._entries(index.slice(rank - radius, rank + radius + 1))
+
+    async def _reconcile_loop(self):
+        while True:
+            try:
+                await self.load()
+                self.reconciliations += 1
+            except Exception as e:
+                logger.warning(f"Leaderboard reconciliation failed: {e}")
+            await asyncio.sleep(LEADERBOARD_RECONCILE_INTERVAL)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._profiles),
+            "loaded_at": self.loaded_at,
+            "reconciliations": self.reconciliations,
+        }
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,103 @@
+# backend/app/services/leveling.py
+"""Level progression helpers.
+
+Leveling from ``level`` to ``level + 1`` costs ``level * 100`` experience,
+so reaching level L from level 1 costs 50 * L * (L - 1) in total. Users
+store ``level`` plus the experience carried inside that level; both can
+be recovered from the running total in closed form.
+"""
+from math import isqrt
+from typing import Dict, Iterable
+
+EXP_PER_LEVEL = 100
+ATTRIBUTES = ("strength", "agility", "vitality", "intelligence")
+
+
+def experience_to_reach(level: int) -> int:
+    """Total experience needed to go from level 1 to ``level``"""
+    return EXP_PER_LEVEL * level * (level - 1) // 2
+
+
+def total_experience(level: int, experience: int) -> int:
+    return experience_to_reach(level) + experience
+
+
+def level_for_total_experience(total: int) -> tuple[int, int]:
+    """Return ``(level, experience_into_level)`` for a running total"""
+    # Largest L with 50 * L * (L - 1) <= total
+    k = max(total, 0) // (EXP_PER_LEVEL // 2)
+    level = (isqrt(4 * k + 1) + 1) // 2
+    return level, total - experience_to_reach(level)
+
+
+def effective_attributes(attributes: Dict[str, int], bonuses: Dict[str, int]) -> Dict[str, int]:
+    """Base attributes plus equipment bonuses"""
+    return {attr: attributes.get(attr, 1) + bonuses.get(attr, 0) for attr in ATTRIBUTES}
+
+
+def sum_bonuses(bonuses: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    total: Dict[str, int] = {}
+    for bonus in bonuses:
+        for attr, amount in bonus.items():
+            total[attr] = total.get(attr, 0) + amount
+    return total
+
+
+def effective_attributes_expression(bonuses: Dict[str, int]) -> dict:
+    """``effective_attributes`` computed on the server from the stored base"""
+    return {
+        attr: {"$add": [{"$ifNull": [f"$attributes.{attr}", 1]}, bonuses.get(attr, 0)]}
+        for attr in ATTRIBUTES
+    }
+
+
+def stats_update_pipeline(experience_gained: int, attributes_gained: Dict[str, int]) -> list:
+    """Update pipeline applying a stat grant atomically on the server.
+
+    Mirrors ``level_for_total_experience``; the square root is exact for
+    any realistic total since it is taken over integers below 2**52.
+    """
+    half = EXP_PER_LEVEL // 2
+    total = {"$add": [
+        {"$multiply": [half, "$level", {"$subtract": ["$level", 1]}]},
+        "$experience",
+        experience_gained,
+    ]}
+    new_level = {"$floor": {"$divide": [
+        {"$add": [{"$sqrt": {"$add": [
+            {"$multiply": [4, {"$floor": {"$divide": ["$$total", half]}}]}, 1
+        ]}}, 1]},
+        2,
+    ]}}
+
+    stage = {
+        f"attributes.{attr}": {"$add": [{"$ifNull": [f"$attributes.{attr}", 1]}, gain]}
+        for attr, gain in attributes_gained.items()
+    }
+    if attributes_gained:
+        # Keep the denormalized effective stats in step, once they exist
+        stage["effective_attributes"] = {"$cond": [
+            {"$ifNull": ["$effective_attributes", False]},
+            {"$mergeObjects": ["$effective_attributes", {
+                attr: {"$add": [{"$ifNull": [
+                    f"$effective_attributes.{attr}", {"$ifNull": [f"$attributes.{attr}", 1]}
+                ]}, gain]}
+                for attr, gain in attributes_gained.items()
+            }]},
+            "$$REMOVE",
+        ]}
+    return [
+        {"$set": {"_total": total}},
+        {"$set": {"level": {"$let": {
+            "vars": {"total": "$_total"},
+            "in": {"$toInt": new_level},
+        }}}},
+        {"$set": {
+            "experience": {"$toLong": {"$subtract": [
+                "$_total",
+                {"$multiply": [half, "$level", {"$subtract": ["$level", 1]}]},
+            ]}},
+            **stage,
+        }},
+        {"$project": {"_total": 0}},
+    ]
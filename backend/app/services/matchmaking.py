@@ -0,0 +1,263 @@
+# backend/app/services/matchmaking.py
+"""In-memory PvP duel matchmaking.
+
+Waiting players are kept in one FIFO queue per ``(user_class, level band)``
+where a band spans ``MATCHMAKING_BAND_SIZE`` levels; each queue is an
+``OrderedDict`` keyed by user id, so joining and leaving are O(1). Every
+``MATCHMAKING_TICK_INTERVAL`` the matcher pairs the oldest players within
+each band, then pairs leftovers from neighbouring bands of the same class
+if the longer-waiting of the two is allowed that far: the reach grows by
+one band per ``MATCHMAKING_WIDEN_SECONDS`` waited, up to
+``MATCHMAKING_MAX_WIDEN``. A tick costs O(bands + matches), independent
+of how many players are waiting.
+
+Joining the queue costs ``DUEL_ENERGY_COST`` energy, spent before the
+ticket is created (see ``routes/duels.py``). Only a match keeps it: a
+ticket that is cancelled, or still waiting when the worker shuts down
+(including a ``MAX_REQUESTS_PER_WORKER`` recycle), is refunded. Tickets
+of a worker that crashes are not.
+
+Matches are delivered to long-polling clients through a future per
+ticket and kept for ``MATCHMAKING_RESULT_TTL`` seconds for clients that
+poll again after the match was made.
+
+The queue lives in the worker process, so exactly one worker may run it:
+``DUEL_WORKER`` is set by ``app.server``, which pins duels to worker 0 and
+its ``DUEL_PORT`` listener (see there). Other workers refuse duel
+requests instead of queueing players nobody else can see.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set
+import asyncio
+import os
+import time
+import uuid
+import logging
+from dotenv import load_dotenv
+from ..models.user import UserClass
+from ..services.cache import TTLCache
+from ..services.metrics import registry
+from ..services.user_service import UserService
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MATCHMAKING_TICK_INTERVAL = float(os.getenv("MATCHMAKING_TICK_INTERVAL", 0.5))
+MATCHMAKING_BAND_SIZE = int(os.getenv("MATCHMAKING_BAND_SIZE", 5))
+MATCHMAKING_WIDEN_SECONDS = float(os.getenv("MATCHMAKING_WIDEN_SECONDS", 10))
+MATCHMAKING_MAX_WIDEN = int(os.getenv("MATCHMAKING_MAX_WIDEN", 3))
+MATCHMAKING_POLL_TIMEOUT = float(os.getenv("MATCHMAKING_POLL_TIMEOUT", 25))
+MATCHMAKING_RESULT_TTL = float(os.getenv("MATCHMAKING_RESULT_TTL", 60))
+DUEL_ENERGY_COST = int(os.getenv("DUEL_ENERGY_COST", 10))
+# Unset outside app.server (uvicorn --reload, a single process): this process runs duels
+DUEL_WORKER = os.getenv("DUEL_WORKER", "true").lower() in ("1", "true", "yes")
+DUEL_PORT = int(os.getenv("DUEL_PORT", 0))
+
+time_to_match = registry.histogram(
+    "singularity_matchmaking_wait_seconds", "Time from joining the duel queue to a match",
+    ("user_class",), buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+)
+
+
+class MatchmakingError(Exception):
+    """Custom exception for matchmaking errors"""
+    pass
+
+
+class Ticket:
+    __slots__ = ("user_id", "username", "user_class", "level", "band", "cost", "enqueued_at", "future")
+
+    def __init__(self, user_id: str, username: str, user_class: str, level: int, band: int, cost: int = 0):
+        self.user_id = user_id
+        self.username = username
+        self.user_class = user_class
+        self.level = level
+        self.band = band
+        self.cost = cost  # energy paid to join, refunded unless matched
+        self.enqueued_at = time.monotonic()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def player(self) -> dict:
+        return {"user_id": self.user_id, "username": self.username,
+                "user_class": self.user_class, "level": self.level}
+
+
+class Matchmaker:
+    def __init__(self, tick_interval: float = MATCHMAKING_TICK_INTERVAL,
+                 band_size: int = MATCHMAKING_BAND_SIZE,
+                 widen_seconds: float = MATCHMAKING_WIDEN_SECONDS,
+                 max_widen: int = MATCHMAKING_MAX_WIDEN,
+                 result_ttl: float = MATCHMAKING_RESULT_TTL):
+        self.tick_interval = tick_interval
+        self.band_size = band_size
+        self.widen_seconds = widen_seconds
+        self.max_widen = max_widen
+        # user_class -> band -> user_id -> Ticket, oldest first
+        self._queues: Dict[str, Dict[int, "OrderedDict[str, Ticket]"]] = {c.value: {} for c in UserClass}
+        self._tickets: Dict[str, Ticket] = {}
+        self._results = TTLCache(maxsize=100000, ttl=result_ttl)
+        self._task: Optional[asyncio.Task] = None
+        self._refunds: Set[asyncio.Task] = set()
+        self.enqueued = 0
+        self.cancelled = 0
+        self.matches = 0
+        self.widened_matches = 0
+        self.ticks = 0
+        self.last_tick_ms = 0.0
+
+    def is_queued(self, user_id: str) -> bool:
+        return user_id in self._tickets
+
+    def enqueue(self, user: dict, cost: int = 0) -> Ticket:
+        user_id = user["id"]
+        if user_id in self._tickets:
+            raise MatchmakingError("Already queued")
+        user_class = str(getattr(user.get("user_class"), "value", user.get("user_class")))
+        if user_class not in self._queues:
+            raise MatchmakingError("Unknown user class")
+        level = user.get("level", 1)
+        ticket = Ticket(user_id, user.get("username"), user_class, level, level // self.band_size, cost)
+        self._queues[user_class].setdefault(ticket.band, OrderedDict())[user_id] = ticket
+        self._tickets[user_id] = ticket
+        self._results.pop(user_id)
+        self.enqueued += 1
+        return ticket
+
+    def _remove(self, ticket: Ticket):
+        del self._tickets[ticket.user_id]
+        bands = self._queues[ticket.user_class]
+        queue = bands[ticket.band]
+        del queue[ticket.user_id]
+        if not queue:
+            del bands[ticket.band]
+
+    def cancel(self, user_id: str) -> bool:
+        ticket = self._tickets.get(user_id)
+        if ticket is None:
+            return False
+        self._remove(ticket)
+        if not ticket.future.done():
+            ticket.future.set_result(None)
+        if ticket.cost > 0:
+            task = asyncio.create_task(self._refund(ticket.user_id, ticket.cost))
+            self._refunds.add(task)
+            task.add_done_callback(self._refunds.discard)
+        self.cancelled += 1
+        return True
+
+    async def _refund(self, user_id: str, amount: int):
+        try:
+            await UserService.refund_energy(user_id, amount)
+        except Exception as e:
+            logger.error(f"Refunding {amount} energy to {user_id} failed: {e}")
+
+    async def wait(self, user_id: str, timeout: float = MATCHMAKING_POLL_TIMEOUT) -> Optional[dict]:
+        """The user's match, waiting up to ``timeout``; None if there is none yet"""
+        match = self._results.get(user_id)
+        if match is not None:
+            return match
+        ticket = self._tickets.get(user_id)
+        if ticket is None:
+            raise MatchmakingError("Not queued")
+        try:
+            # Shielded: a poller giving up must not cancel the ticket
+            return await asyncio.wait_for(asyncio.shield(ticket.future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _reach(self, ticket: Ticket, now: float) -> int:
+        return min(self.max_widen, int((now - ticket.enqueued_at) / self.widen_seconds))
+
+    def _match(self, a: Ticket, b: Ticket, now: float):
+        match = {
+            "match_id": uuid.uuid4().hex,
+            "created_at": datetime.utcnow(),
+            "players": [a.player(), b.player()],
+        }
+        for ticket in (a, b):
+            self._results.set(ticket.user_id, match)
+            time_to_match.observe(now - ticket.enqueued_at, ticket.user_class)
+            if not ticket.future.done():
+                ticket.future.set_result(match)
+        self.matches += 1
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Run one matching pass; returns the number of matches made"""
+        now = time.monotonic() if now is None else now
+        started = time.perf_counter()
+        matches = self.matches
+        for bands in self._queues.values():
+            leftovers = []
+            for band in sorted(bands):
+                queue = bands[band]
+                while len(queue) >= 2:
+                    a = queue.popitem(last=False)[1]
+                    b = queue.popitem(last=False)[1]
+                    del self._tickets[a.user_id], self._tickets[b.user_id]
+                    self._match(a, b, now)
+                if queue:
+                    leftovers.append(next(iter(queue.values())))
+                else:
+                    del bands[band]
+
+            # At most one player is left per band; pair neighbours whose wait allows the gap
+            i = 0
+            while i < len(leftovers) - 1:
+                a, b = leftovers[i], leftovers[i + 1]
+                if b.band - a.band <= max(self._reach(a, now), self._reach(b, now)):
+                    self._remove(a)
+                    self._remove(b)
+                    self._match(a, b, now)
+                    self.widened_matches += 1
+                    i += 2
+                else:
+                    i += 1
+        self.ticks += 1
+        self.last_tick_ms = (time.perf_counter() - started) * 1000
+        return self.matches - matches
+
+    async def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Matchmaking tick failed: {e}")
+            await asyncio.sleep(self.tick_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for user_id in list(self._tickets):
+            self.cancel(user_id)
+        # Before the database connection closes
+        if self._refunds:
+            await asyncio.gather(*self._refunds)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._tickets),
+            "queued_by_class": {
+                user_class: sum(len(queue) for queue in bands.values())
+                for user_class, bands in self._queues.items()
+            },
+            "enqueued": self.enqueued,
+            "cancelled": self.cancelled,
+            "matches": self.matches,
+            "widened_matches": self.widened_matches,
+            "ticks": self.ticks,
+            "last_tick_ms": self.last_tick_ms,
+        }
+
+
+matchmaker = Matchmaker()
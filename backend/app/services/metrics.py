@@ -0,0 +1,161 @@
+# backend/app/services/metrics.py
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Request latency is recorded by ``TimingMiddleware``; code inside a request
+wraps expensive work in ``span("db")`` / ``span("hash")`` so the time shows
+up both in a per-span histogram and in the response's ``Server-Timing``
+header.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+import sys
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Span name -> accumulated seconds for the request being served
+_request_spans: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in self._series.items():
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cumulative}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.gauges: Dict[str, float] = {}
+        self._stats: Dict[str, Callable[[], dict]] = {}
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, help, labels, buckets)
+        return self.histograms[name]
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def register_stats(self, prefix: str, source: Callable[[], dict]):
+        """Expose every numeric value of ``source()`` as a gauge under ``prefix``"""
+        self._stats[prefix] = source
+
+    def _flatten(self, prefix: str, stats: dict, lines: list):
+        for key, value in stats.items():
+            name = f"{prefix}_{key}"
+            if isinstance(value, dict):
+                self._flatten(name, value, lines)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{name} {value}")
+
+    def render(self) -> str:
+        lines = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        for name, value in self.gauges.items():
+            lines.append(f"{name} {value}")
+        for prefix, source in self._stats.items():
+            self._flatten(prefix, source(), lines)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_latency = registry.histogram(
+    "singularity_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+span_latency = registry.histogram(
+    "singularity_span_duration_seconds", "Time spent in instrumented spans", ("span",)
+)
+
+
+@contextmanager
+def span(name: str):
+    """Time a block; works around both sync and awaited code"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        span_latency.observe(elapsed, name)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + elapsed
+
+
+def server_timing(spans: Dict[str, float], total: float) -> bytes:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in spans.items()]
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts).encode()
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware: per-route latency histogram plus Server-Timing"""
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        spans: Dict[str, float] = {}
+        token = _request_spans.set(spans)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(spans, time.perf_counter() - started)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiled = self.profiler is not None and self.profiler.enabled
+        if profiled:
+            self.profiler.begin(sys._getframe(), scope)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            request_latency.observe(elapsed, scope["method"], route_path, status)
+            if profiled:
+                self.profiler.end(sys._getframe(), elapsed, route_path, status)
+            _request_spans.reset(token)
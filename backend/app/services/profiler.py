@@ -0,0 +1,116 @@
+# backend/app/services/profiler.py
+"""Opt-in sampling profiler that keeps stacks for the slowest requests.
+
+A daemon thread samples the event loop thread's stack every
+``PROFILER_INTERVAL_MS``. A sample belongs to whichever request's
+``TimingMiddleware`` frame is on that stack, so concurrent requests on the
+loop are told apart. When a request ends, its collapsed stacks are kept if
+it ranks among the ``PROFILER_TOP_N`` slowest seen so far.
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+import heapq
+import os
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", 5))
+PROFILER_TOP_N = int(os.getenv("PROFILER_TOP_N", 20))
+MAX_STACK_DEPTH = 64
+
+
+class _ActiveRequest:
+    __slots__ = ("method", "path", "started", "samples")
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.started = time.time()
+        self.samples: Counter = Counter()
+
+
+class SlowRequestProfiler:
+    def __init__(self, enabled: bool = PROFILER_ENABLED, interval_ms: float = PROFILER_INTERVAL_MS,
+                 top_n: int = PROFILER_TOP_N):
+        self.enabled = enabled
+        self.interval = interval_ms / 1000
+        self.top_n = top_n
+        # id(middleware frame) -> request being served by that frame
+        self._active: Dict[int, _ActiveRequest] = {}
+        self._slowest: List[tuple] = []
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    def begin(self, frame, scope):
+        self._active[id(frame)] = _ActiveRequest(scope)
+
+    def end(self, frame, elapsed: float, route: str, status: int):
+        request = self._active.pop(id(frame), None)
+        if request is None:
+            return
+        self._seq += 1
+        record = (elapsed, self._seq, {
+            "method": request.method,
+            "path": request.path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "started_at": request.started,
+            "samples": sum(request.samples.values()),
+            "stacks": [
+                {"stack": stack, "samples": count}
+                for stack, count in request.samples.most_common(10)
+            ],
+        })
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, record)
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, record)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            request = self._active.get(id(frame))
+            if request is not None:
+                if stack:
+                    request.samples[";".join(reversed(stack))] += 1
+                return
+            code = frame.f_code
+            stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # Frames can disappear mid-walk; drop the sample
+                pass
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def slowest(self) -> List[dict]:
+        return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+
+profiler = SlowRequestProfiler()
@@ -0,0 +1,278 @@
+# backend/app/services/quest_service.py
+"""Incremental quest progress.
+
+Accepting a quest writes one ``quest_progress`` entry per requirement,
+keyed by ``(user_id, exercise_id)``. That index is the inverted index the
+engine uses: a flushed batch of exercise logs only touches the entries for
+the exercises it contains, never the user's log history or unrelated
+quests.
+
+Each entry is advanced with one atomic update that also flips ``done``
+when the count reaches the target; because the update only matches
+entries that are not done yet, exactly one update observes the flip. That
+update decrements ``remaining`` on the ``user_quests`` row, and the quest
+completes when an update moves it from ``active`` to ``completed``. Only
+the caller whose update made that transition grants the rewards.
+
+Completion also sets ``rewarded: False``, cleared once the grant lands.
+The grant is idempotent per ``user_quests`` row (see
+``UserService.grant_rewards``), so a grant that failed or was interrupted
+is simply retried by ``grant_pending_rewards`` the next time the user's
+quests are read.
+
+Daily and weekly quests can be accepted again each period: their rows
+carry a ``period`` (the UTC day or week they were accepted in) as part of
+the unique key, and stop advancing at ``expires_at``.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+import asyncio
+import logging
+from ..models.game import Quest
+from ..services.database import get_database
+from ..services.user_service import UserService
+from ..services.analytics import bucket_start
+
+logger = logging.getLogger(__name__)
+
+# Quest types that can be accepted again every period
+REPEATABLE_PERIODS = {"daily": ("day", timedelta(days=1)), "weekly": ("week", timedelta(weeks=1))}
+
+
+class QuestServiceError(Exception):
+    """Custom exception for quest service errors"""
+    pass
+
+
+def progress_amount(log: dict) -> int:
+    """How far one exercise log advances a requirement.
+
+    Requirements count repetitions (``{"pushups": 50}``) when the log has
+    reps, minutes for timed exercises, and one per log otherwise.
+    """
+    if log.get("reps"):
+        return log["reps"] * (log.get("sets") or 1)
+    if log.get("duration_minutes"):
+        return log["duration_minutes"]
+    return 1
+
+
+def quest_period(quest_type: str, now: datetime) -> Tuple[Optional[str], Optional[datetime]]:
+    """``(period, expires_at)`` for a quest accepted at ``now``; Nones if it is not repeatable"""
+    if quest_type not in REPEATABLE_PERIODS:
+        return None, None
+    period, length = REPEATABLE_PERIODS[quest_type]
+    start = bucket_start(now, period)
+    return f"{start:%Y-%m-%d}", start + length
+
+
+def _progress_id(user_id: str, quest_id: str, period: Optional[str], exercise_id: str) -> str:
+    if period is None:
+        return f"{user_id}:{quest_id}:{exercise_id}"
+    return f"{user_id}:{quest_id}:{period}:{exercise_id}"
+
+
+def _quest_key(quest_id: str):
+    """``quests._id`` for an id from the API or a user_quests row, which keep it as a string"""
+    return ObjectId(quest_id) if ObjectId.is_valid(quest_id) else quest_id
+
+
+def _quest(doc: dict) -> Quest:
+    return Quest(id=str(doc["_id"]), **{k: v for k, v in doc.items() if k != "_id"})
+
+
+class QuestService:
+    @staticmethod
+    async def get_quests(quest_type: Optional[str] = None) -> List[Quest]:
+        query = {"quest_type": quest_type} if quest_type else {}
+        try:
+            db = get_database()
+            return [_quest(doc) async for doc in db.quests.find(query)]
+        except Exception as e:
+            logger.error(f"Error fetching quests: {e}")
+            raise QuestServiceError("Database error occurred")
+
+    @staticmethod
+    async def accept_quest(user_id: str, quest_id: str) -> dict:
+        db = get_database()
+        doc = await db.quests.find_one({"_id": _quest_key(quest_id)})
+        if not doc:
+            raise QuestServiceError("Quest not found")
+        quest = _quest(doc)
+        if quest.quest_type == "community":
+            raise QuestServiceError("Community quests cannot be accepted")
+        if not quest.requirements:
+            raise QuestServiceError("Quest has no requirements")
+
+        now = datetime.utcnow()
+        period, expires_at = quest_period(quest.quest_type, now)
+        user_quest = {
+            "user_id": user_id,
+            "quest_id": quest_id,
+            "period": period,
+            "status": "active",
+            "remaining": len(quest.requirements),
+            "accepted_at": now,
+        }
+        if expires_at:
+            user_quest["expires_at"] = expires_at
+        try:
+            await db.user_quests.insert_one(user_quest)
+        except DuplicateKeyError:
+            raise QuestServiceError("Quest already accepted")
+
+        entries = [
+            {
+                "_id": _progress_id(user_id, quest_id, period, exercise_id),
+                "user_id": user_id,
+                "quest_id": quest_id,
+                "period": period,
+                "exercise_id": exercise_id,
+                "target": target,
+                "count": 0,
+                "done": False,
+            }
+            for exercise_id, target in quest.requirements.items()
+        ]
+        if expires_at:
+            for entry in entries:
+                entry["expires_at"] = expires_at
+        try:
+            await db.quest_progress.insert_many(entries, ordered=False)
+        except BulkWriteError:
+            pass  # entries left over from an earlier attempt are kept as-is
+
+        user_quest.pop("_id", None)
+        return {**user_quest, "progress": {e["exercise_id"]: {"count": 0, "target": e["target"]} for e in entries}}
+
+    @staticmethod
+    async def get_user_quests(user_id: str, status: Optional[str] = None) -> List[dict]:
+        db = get_database()
+        await QuestService.grant_pending_rewards(user_id)
+        query = {"user_id": user_id}
+        if status:
+            query["status"] = status
+        quests = await db.user_quests.find(query, {"_id": 0}).to_list(None)
+        if not quests:
+            return []
+
+        progress = defaultdict(dict)
+        quest_ids = list({q["quest_id"] for q in quests})
+        async for entry in db.quest_progress.find({"user_id": user_id, "quest_id": {"$in": quest_ids}}):
+            progress[(entry["quest_id"], entry.get("period"))][entry["exercise_id"]] = {
+                "count": min(entry["count"], entry["target"]), "target": entry["target"]
+            }
+        now = datetime.utcnow()
+        for quest in quests:
+            quest["progress"] = progress.get((quest["quest_id"], quest.get("period")), {})
+            if quest["status"] == "active" and quest.get("expires_at") and quest["expires_at"] <= now:
+                quest["status"] = "expired"
+        return quests
+
+    @staticmethod
+    async def record_progress(logs: List[dict]) -> int:
+        """Advance quests for a batch of stored exercise logs; returns completions"""
+        amounts: Dict[tuple, int] = defaultdict(int)
+        for log in logs:
+            amounts[(log["user_id"], log["exercise_id"])] += progress_amount(log)
+        if not amounts:
+            return 0
+
+        db = get_database()
+        # One indexed lookup for the whole batch; only open, unexpired requirements match
+        entries = await db.quest_progress.find(
+            {
+                "user_id": {"$in": list({user_id for user_id, _ in amounts})},
+                "exercise_id": {"$in": list({exercise_id for _, exercise_id in amounts})},
+                "done": False,
+                "$or": [{"expires_at": {"$exists": False}}, {"expires_at": {"$gt": datetime.utcnow()}}],
+            },
+            {"user_id": 1, "quest_id": 1, "period": 1, "exercise_id": 1}
+        ).to_list(None)
+
+        affected = [e for e in entries if (e["user_id"], e["exercise_id"]) in amounts]
+        results = await asyncio.gather(*(
+            QuestService._advance(db, entry, amounts[(entry["user_id"], entry["exercise_id"])])
+            for entry in affected
+        ))
+        return sum(results)
+
+    @staticmethod
+    async def _advance(db, entry: dict, amount: int) -> int:
+        updated = await db.quest_progress.find_one_and_update(
+            {"_id": entry["_id"], "done": False},
+            [
+                {"$set": {"count": {"$add": ["$count", amount]}}},
+                {"$set": {"done": {"$gte": ["$count", "$target"]}}},
+            ],
+            projection={"done": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not updated or not updated["done"]:
+            return 0
+
+        # This update finished the requirement; count it against the quest
+        user_quest = await db.user_quests.find_one_and_update(
+            {"user_id": entry["user_id"], "quest_id": entry["quest_id"], "period": entry.get("period"),
+             "status": "active"},
+            {"$inc": {"remaining": -1}},
+            projection={"remaining": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not user_quest or user_quest["remaining"] > 0:
+            return 0
+        return await QuestService._complete(db, user_quest["_id"])
+
+    @staticmethod
+    async def _complete(db, user_quest_id) -> int:
+        user_quest = await db.user_quests.find_one_and_update(
+            {"_id": user_quest_id, "status": "active", "remaining": {"$lte": 0}},
+            {"$set": {"status": "completed", "completed_at": datetime.utcnow(), "rewarded": False}},
+            projection={"user_id": 1, "quest_id": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not user_quest:
+            return 0  # someone else completed it
+
+        logger.info(f"User {user_quest['user_id']} completed quest {user_quest['quest_id']}")
+        await QuestService._grant(db, user_quest)
+        return 1
+
+    @staticmethod
+    async def _grant(db, user_quest: dict) -> bool:
+        """Grant a completed quest's rewards; safe to repeat"""
+        user_id, quest_id = user_quest["user_id"], user_quest["quest_id"]
+        quest = await db.quests.find_one({"_id": _quest_key(quest_id)}, {"rewards": 1})
+        rewards = (quest or {}).get("rewards") or {}
+        try:
+            granted = not rewards or await UserService.grant_rewards(
+                user_id, rewards, f"quest:{user_quest['_id']}"
+            )
+        except Exception as e:
+            logger.error(f"Granting rewards for quest {quest_id} to user {user_id} failed: {e}")
+            granted = False
+        if not granted:
+            logger.error(f"Could not grant rewards for quest {quest_id} to user {user_id}; will retry")
+            return False
+        await db.user_quests.update_one(
+            {"_id": user_quest["_id"]},
+            {"$set": {"rewarded": True, "rewards_granted": rewards}}
+        )
+        return True
+
+    @staticmethod
+    async def grant_pending_rewards(user_id: str) -> int:
+        """Retry grants for completed quests whose rewards did not land"""
+        db = get_database()
+        pending = await db.user_quests.find(
+            {"user_id": user_id, "status": "completed", "rewarded": False},
+            {"user_id": 1, "quest_id": 1}
+        ).to_list(None)
+        granted = 0
+        for user_quest in pending:
+            granted += await QuestService._grant(db, user_quest)
+        return granted
@@ -0,0 +1,172 @@
+# backend/app/services/rate_limiter.py
+from typing import Dict, Optional
+from pymongo import ReturnDocument
+import asyncio
+import os
+import time
+import logging
+from dotenv import load_dotenv
+from .database import get_database
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "mongo"
+RATE_LIMIT_EVICT_INTERVAL = float(os.getenv("RATE_LIMIT_EVICT_INTERVAL", 60))
+
+# "<requests>/<seconds>" per client IP
+DEFAULT_POLICIES = {
+    "register": os.getenv("RATE_LIMIT_REGISTER", "5/300"),
+    "login": os.getenv("RATE_LIMIT_LOGIN", "5/300"),
+    "refresh": os.getenv("RATE_LIMIT_REFRESH", "30/300"),
+}
+
+
+class RateLimitPolicy:
+    """Allow ``limit`` requests per ``period`` seconds, bursting up to ``limit``"""
+
+    def __init__(self, name: str, limit: int, period: float):
+        if limit < 1 or period <= 0:
+            raise ValueError(f"Invalid rate limit policy {name}: {limit}/{period}")
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.interval = period / limit
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimitPolicy":
+        limit, period = spec.split("/")
+        return cls(name, int(limit), float(period))
+
+
+def gcra(tat: Optional[float], now: float, policy: RateLimitPolicy) -> tuple[bool, float, float]:
+    """Generic cell rate algorithm.
+
+    ``tat`` is the theoretical arrival time stored for the key. Returns
+    ``(allowed, new_tat, retry_after)``.
+    """
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + policy.interval
+    excess = new_tat - now - policy.period
+    if excess > 0:
+        return False, tat, excess
+    return True, new_tat, 0.0
+
+
+class MemoryRateLimitBackend:
+    """Per-process GCRA state: a single float per key"""
+
+    def __init__(self):
+        self._tat: Dict[str, float] = {}
+
+    async def hit(self, key: str, policy: RateLimitPolicy, now: float) -> float:
+        allowed, new_tat, retry_after = gcra(self._tat.get(key), now, policy)
+        if allowed:
+            self._tat[key] = new_tat
+        return retry_after
+
+    def evict_idle(self, now: float) -> int:
+        # A key whose TAT is in the past behaves exactly like a missing key
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class MongoRateLimitBackend:
+    """GCRA state shared by every worker through the ``rate_limits`` collection.
+
+    Each check is one atomic ``find_one_and_update`` with an update pipeline;
+    the TTL index on ``expires_at`` removes idle keys.
+    """
+
+    collection_name = "rate_limits"
+
+    async def hit(self, key: str, policy: RateLimitPolicy, now: float) -> float:
+        db = get_database()
+        doc = await db[self.collection_name].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"_tat": {"$max": [{"$ifNull": ["$tat", now]}, now]}}},
+                {"$set": {"allowed": {"$lte": [
+                    {"$subtract": [{"$add": ["$_tat", policy.interval]}, now]},
+                    policy.period,
+                ]}}},
+                {"$set": {"tat": {"$cond": [
+                    "$allowed", {"$add": ["$_tat", policy.interval]}, "$_tat"
+                ]}}},
+                {"$set": {"expires_at": {"$toDate": {"$multiply": ["$tat", 1000]}}}},
+                {"$unset": "_tat"},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["allowed"]:
+            return 0.0
+        return doc["tat"] + policy.interval - now - policy.period
+
+    def evict_idle(self, now: float) -> int:
+        return 0
+
+
+class RateLimiter:
+    def __init__(self, policies: Dict[str, str] = DEFAULT_POLICIES,
+                 backend: str = RATE_LIMIT_BACKEND):
+        self.policies = {name: RateLimitPolicy.parse(name, spec) for name, spec in policies.items()}
+        self.local = MemoryRateLimitBackend()
+        self.backend = MongoRateLimitBackend() if backend == "mongo" else self.local
+        self.limited = 0
+        self.backend_errors = 0
+        self._evict_task: Optional[asyncio.Task] = None
+
+    async def check(self, policy_name: str, client_key: str) -> float:
+        """Record a request; returns 0 if allowed, else seconds until retry"""
+        policy = self.policies[policy_name]
+        key = f"{policy_name}:{client_key}"
+        now = time.time()
+        try:
+            retry_after = await self.backend.hit(key, policy, now)
+        except Exception as e:
+            # Shared backend unavailable: keep limiting per process
+            self.backend_errors += 1
+            logger.warning(f"Rate limit backend error, using local limiter: {e}")
+            retry_after = await self.local.hit(key, policy, now)
+
+        if retry_after > 0:
+            self.limited += 1
+        return retry_after
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(RATE_LIMIT_EVICT_INTERVAL)
+            evicted = self.local.evict_idle(time.time())
+            if evicted:
+                logger.debug(f"Evicted {evicted} idle rate limit keys")
+
+    def start(self):
+        if self._evict_task is None:
+            self._evict_task = asyncio.create_task(self._evict_loop())
+
+    async def stop(self):
+        if self._evict_task is not None:
+            self._evict_task.cancel()
+            try:
+                await self._evict_task
+            except asyncio.CancelledError:
+                pass
+            self._evict_task = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": RATE_LIMIT_BACKEND,
+            "local_keys": len(self.local),
+            "limited": self.limited,
+            "backend_errors": self.backend_errors,
+        }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,72 @@
+# backend/app/services/serialization.py
+"""Fast JSON rendering for API responses.
+
+``FastJSONResponse`` is the app's default response class: it renders with
+orjson (falling back to the stdlib encoder when orjson is missing) and
+handles ``datetime`` and ``ObjectId`` without going through
+``jsonable_encoder``. Hot endpoints skip FastAPI's response validation
+entirely by returning ``json_response(...)`` built from precompiled
+TypeAdapters over models constructed straight from our own documents.
+"""
+from datetime import datetime
+from typing import Any
+from bson import ObjectId
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+from ..models.user import UserResponse, TokenResponse
+from ..models.exercise import ExerciseLogPage
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Built once at import instead of per response
+user_response_adapter = TypeAdapter(UserResponse)
+token_response_adapter = TypeAdapter(TokenResponse)
+log_page_adapter = TypeAdapter(ExerciseLogPage)
+
+_USER_FIELDS = tuple(UserResponse.model_fields)
+
+
+def user_response(user: dict) -> UserResponse:
+    """UserResponse from a trusted database document, without validation"""
+    return UserResponse.model_construct(**{k: user[k] for k in _USER_FIELDS if k in user})
+
+
+def json_response(adapter: TypeAdapter, value: Any, status_code: int = 200) -> Response:
+    return Response(content=adapter.dump_json(value), status_code=status_code,
+                    media_type="application/json")
+
+
+def token_response(access_token: str, refresh_token: str, user: dict) -> Response:
+    envelope = TokenResponse.model_construct(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        token_type="bearer",
+        user=user_response(user),
+    )
+    return json_response(token_response_adapter, envelope)
@@ -0,0 +1,199 @@
+# backend/app/services/sharded_counter.py
+"""Sharded counters for goals that many users advance at once.
+
+A counter is stored as up to ``COUNTER_SHARDS`` documents in
+``counter_shards`` (``{_id: "<name>:<shard>", counter, shard, value}``)
+and its value is the sum of its shards. Increments are first summed in
+process and written every ``COUNTER_FLUSH_INTERVAL`` seconds, one ``$inc``
+per counter into a randomly chosen shard, so no single document takes
+every worker's writes.
+
+Reads come from a short-lived cache of shard sums (``COUNTER_TOTAL_TTL``)
+plus whatever this worker has not flushed yet.
+
+``watch`` registers a threshold. After each flush the worker that wrote
+to a watched counter re-reads its exact total; once it reaches the
+target, the first worker to insert into ``counter_thresholds`` wins and
+runs the callback. The callback therefore runs once across all workers.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import asyncio
+import os
+import random
+import logging
+from dotenv import load_dotenv
+from ..services.cache import TTLCache
+from ..services.database import get_database
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COUNTER_SHARDS = int(os.getenv("COUNTER_SHARDS", 16))
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", 1.0))
+COUNTER_TOTAL_TTL = float(os.getenv("COUNTER_TOTAL_TTL", 2.0))
+
+ThresholdCallback = Callable[[str, int], Awaitable[None]]
+
+
+class ShardedCounters:
+    def __init__(self, shards: int = COUNTER_SHARDS, flush_interval: float = COUNTER_FLUSH_INTERVAL,
+                 total_ttl: float = COUNTER_TOTAL_TTL):
+        self.shards = shards
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._totals = TTLCache(maxsize=10000, ttl=total_ttl)
+        self._thresholds: Dict[str, Tuple[int, ThresholdCallback]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.increments = 0
+        self.writes = 0
+        self.flushes = 0
+        self.failures = 0
+        self.thresholds_fired = 0
+
+    def add(self, name: str, amount: int = 1):
+        """Count ``amount`` towards ``name``; written on the next flush"""
+        if amount:
+            self._pending[name] += amount
+            self.increments += 1
+
+    def watch(self, name: str, target: int, callback: ThresholdCallback):
+        """Call ``callback(name, total)`` once, when ``name`` reaches ``target``"""
+        self._thresholds[name] = (target, callback)
+
+    def unwatch(self, name: str):
+        self._thresholds.pop(name, None)
+
+    async def exact_totals(self, names: Iterable[str]) -> Dict[str, int]:
+        """Sum the shards now, bypassing the cache (pending increments excluded)"""
+        names = list(names)
+        totals = dict.fromkeys(names, 0)
+        async for row in get_database().counter_shards.aggregate([
+            {"$match": {"counter": {"$in": names}}},
+            {"$group": {"_id": "$counter", "value": {"$sum": "$value"}}},
+        ]):
+            totals[row["_id"]] = row["value"]
+        for name, value in totals.items():
+            self._totals.set(name, value)
+        return totals
+
+    async def totals(self, names: Iterable[str]) -> Dict[str, int]:
+        """Approximate totals: cached shard sums plus this worker's pending"""
+        totals, missing = {}, []
+        for name in names:
+            value = self._totals.get(name)
+            if value is None:
+                missing.append(name)
+            else:
+                totals[name] = value
+        if missing:
+            totals.update(await self.exact_totals(missing))
+        return {name: value + self._pending.get(name, 0) for name, value in totals.items()}
+
+    async def total(self, name: str) -> int:
+        return (await self.totals([name]))[name]
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, defaultdict(int)
+        names = list(batch)
+        failed = set()
+        try:
+            await get_database().counter_shards.bulk_write([
+                UpdateOne(
+                    {"_id": f"{name}:{shard}"},
+                    {"$inc": {"value": batch[name]}, "$setOnInsert": {"counter": name, "shard": shard}},
+                    upsert=True
+                )
+                for name, shard in ((name, random.randrange(self.shards)) for name in names)
+            ], ordered=False)
+        except BulkWriteError as e:
+            failed = {names[error["index"]] for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            failed = set(names)
+            logger.warning(f"Counter flush of {len(names)} counters failed: {e}")
+        if failed:
+            # Retried with the next flush
+            self.failures += 1
+            for name in failed:
+                self._pending[name] += batch[name]
+
+        written = [name for name in names if name not in failed]
+        self.writes += len(written)
+        self.flushes += 1
+        for name in written:
+            self._totals.pop(name)
+        await self._check_thresholds([name for name in written if name in self._thresholds])
+
+    async def _check_thresholds(self, names: list):
+        if not names:
+            return
+        for name, total in (await self.exact_totals(names)).items():
+            target, callback = self._thresholds.get(name, (None, None))
+            if target is None or total < target or not await self._claim(name, total):
+                continue
+            self.thresholds_fired += 1
+            self.unwatch(name)
+            try:
+                await callback(name, total)
+            except Exception as e:
+                logger.error(f"Threshold callback for counter {name} failed: {e}")
+
+    async def _claim(self, name: str, total: int) -> bool:
+        """True for exactly one caller per counter, across all workers"""
+        try:
+            await get_database().counter_thresholds.insert_one(
+                {"_id": name, "total": total, "fired_at": datetime.utcnow()}
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Counter flush failed: {e}")
+            if self._stopping:
+                return
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write whatever is still pending, then stop the background task"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "increments": self.increments,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "thresholds_fired": self.thresholds_fired,
+        }
+
+
+counters = ShardedCounters()
@@ -0,0 +1,174 @@
+# backend/app/services/token_revocation.py
+"""Revoked JWT ids: persisted in MongoDB, checked in memory.
+
+Every issued token carries a ``jti``. Revoking one (logout, or a refresh
+token being rotated) inserts ``{_id: jti, expires_at: exp}`` into
+``revoked_tokens``; a TTL index drops the entry once the token would have
+expired anyway. The insert doubles as the single-use check for refresh
+rotation: ``_id`` is unique, so only one caller can ever revoke a given
+refresh token.
+
+Request authentication never queries that collection. Each worker keeps
+a Bloom filter over revoked ids in front of an exact ``jti -> exp`` map:
+almost every live token misses the Bloom filter and is accepted after a
+few hash probes, and false positives are settled by the exact map. Workers
+pull newly revoked ids every ``TOKEN_REVOCATION_SYNC_INTERVAL`` seconds,
+so an access token revoked on another worker is honoured after at most
+that long.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import hashlib
+import math
+import os
+import time
+import logging
+from dotenv import load_dotenv
+from ..services.database import get_database
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_SYNC_INTERVAL = float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", 2.0))
+TOKEN_REVOCATION_CAPACITY = int(os.getenv("TOKEN_REVOCATION_CAPACITY", 100000))
+TOKEN_REVOCATION_FP_RATE = float(os.getenv("TOKEN_REVOCATION_FP_RATE", 0.001))
+
+# Re-read this much history on every sync so entries committed slightly out
+# of revoked_at order (clock skew between workers) are not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class TokenRevocationList:
+    def __init__(self, sync_interval: float = TOKEN_REVOCATION_SYNC_INTERVAL,
+                 capacity: int = TOKEN_REVOCATION_CAPACITY,
+                 fp_rate: float = TOKEN_REVOCATION_FP_RATE):
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self._revoked: Dict[str, float] = {}  # jti -> exp (unix seconds)
+        self._bloom = BloomFilter(capacity, fp_rate)
+        self._synced_to: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.checks = 0
+        self.bloom_hits = 0
+        self.rejected = 0
+        self.syncs = 0
+
+    def _remember(self, jti: str, exp: float):
+        if jti in self._revoked:
+            return
+        self._revoked[jti] = exp
+        self._bloom.add(jti)
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild()
+
+    def _rebuild(self):
+        """Drop expired ids and rebuild the Bloom filter (it cannot delete)"""
+        now = time.time()
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._bloom = BloomFilter(max(self.capacity, 2 * len(self._revoked)), self.fp_rate)
+        for jti in self._revoked:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """In-memory check; no I/O"""
+        if jti is None:
+            return False
+        self.checks += 1
+        if jti not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        if jti in self._revoked:
+            self.rejected += 1
+            return True
+        return False
+
+    async def revoke(self, jti: str, exp: float, reason: str) -> bool:
+        """Persist a revocation; False if the token was already revoked"""
+        now = datetime.utcnow()
+        try:
+            await get_database().revoked_tokens.insert_one({
+                "_id": jti,
+                "expires_at": datetime.utcfromtimestamp(exp),
+                "revoked_at": now,
+                "reason": reason,
+            })
+            revoked = True
+        except DuplicateKeyError:
+            revoked = False
+        self._remember(jti, exp)
+        return revoked
+
+    async def sync(self):
+        """Pull revocations made since the last sync (all live ones at first)"""
+        db = get_database()
+        query = {"expires_at": {"$gt": datetime.utcnow()}}
+        if self._synced_to is not None:
+            query["revoked_at"] = {"$gte": self._synced_to - SYNC_OVERLAP}
+        latest = self._synced_to
+        async for entry in db.revoked_tokens.find(query, {"expires_at": 1, "revoked_at": 1}):
+            self._remember(entry["_id"], (entry["expires_at"] - datetime(1970, 1, 1)).total_seconds())
+            if latest is None or entry["revoked_at"] > latest:
+                latest = entry["revoked_at"]
+        self._synced_to = latest or datetime.utcnow()
+        self.syncs += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Token revocation sync failed: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self._revoked),
+            "checks": self.checks,
+            "bloom_hits": self.bloom_hits,
+            "rejected": self.rejected,
+            "syncs": self.syncs,
+        }
+
+
+revocation_list = TokenRevocationList()
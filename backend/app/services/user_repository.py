@@ -0,0 +1,512 @@
+# backend/app/services/user_repository.py
+"""Storage backends for user documents.
+
+``UserService`` talks to a ``UserRepository`` instead of Motor directly.
+``MongoUserRepository`` is the production backend; ``MemoryUserRepository``
+keeps everything in process (optionally persisted to an append-only log),
+for single-node deployments, benchmarks and tests that should not need a
+MongoDB server. Documents keep the MongoDB shape (``_id`` is an ObjectId)
+on both backends.
+"""
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Set
+from bson import ObjectId, json_util
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import copy
+import os
+import logging
+from dotenv import load_dotenv
+from ..services.database import get_database
+from ..services.energy import (
+    regenerate, spend_energy_filter, spend_energy_pipeline, refund_energy_pipeline, DEFAULT_MAX_ENERGY
+)
+from ..services.leveling import (
+    stats_update_pipeline, total_experience, level_for_total_experience,
+    effective_attributes, effective_attributes_expression, sum_bonuses
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")  # "mongo" or "memory"
+STORAGE_LOG_PATH = os.getenv("STORAGE_LOG_PATH")  # memory backend persistence, optional
+STORAGE_LOG_FSYNC = os.getenv("STORAGE_LOG_FSYNC", "false").lower() in ("1", "true", "yes")
+
+# Most recent reward grant ids remembered per user, to make retried grants no-ops
+REWARD_GRANTS_KEPT = 100
+
+
+class DuplicateUserError(Exception):
+    """Raised when an insert violates a unique user field"""
+
+    def __init__(self, field: str):
+        super().__init__(f"Duplicate value for {field}")
+        self.field = field
+
+
+class UserRepository:
+    """Operations UserService needs on the users collection"""
+
+    async def find_by_email(self, email: str, projection: Optional[dict] = None) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def find_by_id(self, user_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def find_by_username(self, username: str, projection: Optional[dict] = None) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def insert(self, user: dict) -> str:
+        """Insert a new user and return its id; raises DuplicateUserError"""
+        raise NotImplementedError
+
+    async def set_fields(self, user_id: str, fields: dict) -> bool:
+        raise NotImplementedError
+
+    async def increment_fields(self, user_id: str, amounts: dict) -> bool:
+        """Atomically add ``amounts`` to numeric fields (missing fields start at 0).
+
+        Field names may be dotted paths into embedded documents.
+        """
+        raise NotImplementedError
+
+    async def init_effective_attributes(self, user_id: str, bonuses: Dict[str, dict]) -> bool:
+        """Rebuild effective attributes from base attributes and equipment.
+
+        ``bonuses`` maps inventory entry ids to the bonus each equipped entry
+        grants. ``effective_attributes`` becomes base plus their sum, and the
+        map is stored as ``equipment_bonuses``. Only applies to users that have
+        no ``equipment_bonuses`` yet; returns whether it did.
+        """
+        raise NotImplementedError
+
+    async def apply_equipment_bonus(self, user_id: str, entry_id: str, bonus: Dict[str, int]) -> bool:
+        """Add an entry's bonus to ``effective_attributes`` unless already applied"""
+        raise NotImplementedError
+
+    async def remove_equipment_bonus(self, user_id: str, entry_id: str) -> bool:
+        """Subtract an entry's recorded bonus, if it is applied"""
+        raise NotImplementedError
+
+    async def apply_stats(self, user_id: str, experience_gained: int, attributes_gained: dict,
+                          projection: Optional[dict] = None) -> Optional[dict]:
+        """Atomically grant stats; returns the updated document"""
+        raise NotImplementedError
+
+    async def apply_reward(self, user_id: str, grant_id: str, experience_gained: int, amounts: dict,
+                           projection: Optional[dict] = None) -> Optional[dict]:
+        """Atomically grant experience and add ``amounts``, once per ``grant_id``.
+
+        The grant id is recorded in ``reward_grants`` in the same update, so
+        retrying a grant is a no-op. Returns the updated document, or None if
+        the user does not exist or already received this grant.
+        """
+        raise NotImplementedError
+
+    async def touch_many(self, timestamps: Dict[str, Dict[str, datetime]]) -> int:
+        """Move timestamp fields forward for many users at once.
+
+        ``timestamps`` maps user ids to ``{field: datetime}``; a stored value
+        that is already later is kept. Returns the number of users matched.
+        """
+        raise NotImplementedError
+
+    async def spend_energy(self, user_id: str, amount: int, now: datetime,
+                           projection: Optional[dict] = None) -> Optional[dict]:
+        """Atomically regenerate and spend energy; None if it does not cover amount"""
+        raise NotImplementedError
+
+    async def refund_energy(self, user_id: str, amount: int, now: datetime,
+                            projection: Optional[dict] = None) -> Optional[dict]:
+        """Atomically regenerate and give back energy, capped at max_energy; None if the user is gone"""
+        raise NotImplementedError
+
+    def iter_users(self, projection: Optional[dict] = None, batch_size: int = 1000) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+
+class MongoUserRepository(UserRepository):
+    @property
+    def _users(self):
+        return get_database().users
+
+    async def find_by_email(self, email, projection=None):
+        return await self._users.find_one({"email": email.lower()}, projection)
+
+    async def find_by_id(self, user_id, projection=None):
+        return await self._users.find_one({"_id": ObjectId(user_id)}, projection)
+
+    async def find_by_username(self, username, projection=None):
+        return await self._users.find_one({"username": username}, projection)
+
+    async def insert(self, user):
+        try:
+            result = await self._users.insert_one(user)
+        except DuplicateKeyError as e:
+            key_pattern = (e.details or {}).get("keyPattern") or {}
+            raise DuplicateUserError(next(iter(key_pattern), "email"))
+        return str(result.inserted_id)
+
+    async def set_fields(self, user_id, fields):
+        result = await self._users.update_one({"_id": ObjectId(user_id)}, {"$set": fields})
+        return result.matched_count > 0
+
+    async def increment_fields(self, user_id, amounts):
+        result = await self._users.update_one({"_id": ObjectId(user_id)}, {"$inc": amounts})
+        return result.matched_count > 0
+
+    async def init_effective_attributes(self, user_id, bonuses):
+        result = await self._users.update_one(
+            {"_id": ObjectId(user_id), "equipment_bonuses": {"$exists": False}},
+            [{"$set": {
+                "effective_attributes": effective_attributes_expression(sum_bonuses(bonuses.values())),
+                "equipment_bonuses": {"$literal": bonuses},
+            }}]
+        )
+        return result.modified_count > 0
+
+    async def apply_equipment_bonus(self, user_id, entry_id, bonus):
+        # The recorded entry and the $inc land in one document update
+        update = {"$set": {f"equipment_bonuses.{entry_id}": bonus}}
+        if bonus:
+            update["$inc"] = {f"effective_attributes.{attr}": amount for attr, amount in bonus.items()}
+        result = await self._users.update_one(
+            {"_id": ObjectId(user_id), "equipment_bonuses": {"$exists": True},
+             f"equipment_bonuses.{entry_id}": {"$exists": False}},
+            update
+        )
+        return result.modified_count > 0
+
+    async def remove_equipment_bonus(self, user_id, entry_id):
+        user = await self._users.find_one({"_id": ObjectId(user_id)}, {f"equipment_bonuses.{entry_id}": 1})
+        bonus = ((user or {}).get("equipment_bonuses") or {}).get(entry_id)
+        if bonus is None:
+            return False
+        update = {"$unset": {f"equipment_bonuses.{entry_id}": ""}}
+        if bonus:
+            update["$inc"] = {f"effective_attributes.{attr}": -amount for attr, amount in bonus.items()}
+        result = await self._users.update_one(
+            {"_id": ObjectId(user_id), f"equipment_bonuses.{entry_id}": bonus}, update
+        )
+        return result.modified_count > 0
+
+    async def apply_stats(self, user_id, experience_gained, attributes_gained, projection=None):
+        return await self._users.find_one_and_update(
+            {"_id": ObjectId(user_id)},
+            stats_update_pipeline(experience_gained, attributes_gained),
+            projection=projection,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def apply_reward(self, user_id, grant_id, experience_gained, amounts, projection=None):
+        pipeline = stats_update_pipeline(experience_gained, {}) if experience_gained else []
+        pipeline.append({"$set": {
+            **{field: {"$add": [{"$ifNull": [f"${field}", 0]}, amount]} for field, amount in amounts.items()},
+            "reward_grants": {"$slice": [
+                {"$concatArrays": [{"$ifNull": ["$reward_grants", []]}, {"$literal": [grant_id]}]},
+                -REWARD_GRANTS_KEPT,
+            ]},
+        }})
+        return await self._users.find_one_and_update(
+            {"_id": ObjectId(user_id), "reward_grants": {"$ne": grant_id}},
+            pipeline,
+            projection=projection,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def spend_energy(self, user_id, amount, now, projection=None):
+        return await self._users.find_one_and_update(
+            {"_id": ObjectId(user_id), **spend_energy_filter(amount, now)},
+            spend_energy_pipeline(amount, now),
+            projection=projection,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def refund_energy(self, user_id, amount, now, projection=None):
+        return await self._users.find_one_and_update(
+            {"_id": ObjectId(user_id)},
+            refund_energy_pipeline(amount, now),
+            projection=projection,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def touch_many(self, timestamps):
+        if not timestamps:
+            return 0
+        result = await self._users.bulk_write([
+            UpdateOne({"_id": ObjectId(user_id)}, {"$max": fields})
+            for user_id, fields in timestamps.items()
+        ], ordered=False)
+        return result.matched_count
+
+    async def iter_users(self, projection=None, batch_size=1000):
+        async for user in self._users.find({}, projection, batch_size=batch_size):
+            yield user
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if projection is None:
+        return copy.deepcopy(doc)
+    fields = {key for key, include in projection.items() if include}
+    fields.add("_id")
+    return {key: copy.deepcopy(value) for key, value in doc.items() if key in fields}
+
+
+class MemoryUserRepository(UserRepository):
+    """Indexed in-process store with optional append-only log persistence.
+
+    Every mutation runs without awaiting, so it is atomic with respect to
+    the event loop. With a log path, each mutated document is appended as
+    one JSON line and replayed on startup; the log is compacted when it
+    grows well past the live data.
+    """
+
+    def __init__(self, log_path: Optional[str] = STORAGE_LOG_PATH, fsync: bool = STORAGE_LOG_FSYNC):
+        self._docs: Dict[ObjectId, dict] = {}
+        self._by_email: Dict[str, ObjectId] = {}
+        self._by_username: Dict[str, Set[ObjectId]] = {}
+        self.log_path = log_path
+        self.fsync = fsync
+        self._log = None
+        self._log_entries = 0
+        if log_path:
+            self._replay()
+
+    # Persistence -----------------------------------------------------------
+
+    def _replay(self):
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json_util.loads(line))
+                        self._log_entries += 1
+            logger.info(f"Replayed {self._log_entries} log entries into {len(self._docs)} users")
+        if self._log_entries > 2 * len(self._docs) + 1000:
+            self._compact()
+        self._log = open(self.log_path, "a")
+
+    def _compact(self):
+        tmp_path = f"{self.log_path}.compact"
+        with open(tmp_path, "w") as f:
+            for doc in self._docs.values():
+                f.write(json_util.dumps(doc) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+        self._log_entries = len(self._docs)
+
+    def _persist(self, doc: dict):
+        if self._log is None:
+            return
+        self._log.write(json_util.dumps(doc) + "\n")
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._log_entries += 1
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # Indexes ---------------------------------------------------------------
+
+    def _index(self, doc: dict):
+        previous = self._docs.get(doc["_id"])
+        if previous is not None:
+            self._unindex(previous)
+        self._docs[doc["_id"]] = doc
+        self._by_email[doc["email"]] = doc["_id"]
+        self._by_username.setdefault(doc.get("username"), set()).add(doc["_id"])
+
+    def _unindex(self, doc: dict):
+        self._by_email.pop(doc["email"], None)
+        ids = self._by_username.get(doc.get("username"))
+        if ids:
+            ids.discard(doc["_id"])
+            if not ids:
+                del self._by_username[doc.get("username")]
+
+    def _get(self, user_id: str) -> Optional[dict]:
+        try:
+            return self._docs.get(ObjectId(user_id))
+        except Exception:
+            return None
+
+    # UserRepository --------------------------------------------------------
+
+    async def find_by_email(self, email, projection=None):
+        user_id = self._by_email.get(email.lower())
+        return _project(self._docs[user_id], projection) if user_id else None
+
+    async def find_by_id(self, user_id, projection=None):
+        doc = self._get(user_id)
+        return _project(doc, projection) if doc else None
+
+    async def find_by_username(self, username, projection=None):
+        ids = self._by_username.get(username)
+        return _project(self._docs[min(ids)], projection) if ids else None
+
+    async def insert(self, user):
+        if user["email"] in self._by_email:
+            raise DuplicateUserError("email")
+        if user.get("username") in self._by_username:
+            raise DuplicateUserError("username")
+        doc = copy.deepcopy(user)
+        doc.setdefault("_id", ObjectId())
+        user["_id"] = doc["_id"]
+        self._index(doc)
+        self._persist(doc)
+        return str(doc["_id"])
+
+    async def set_fields(self, user_id, fields):
+        doc = self._get(user_id)
+        if doc is None:
+            return False
+        self._unindex(doc)
+        doc.update(copy.deepcopy(fields))
+        self._index(doc)
+        self._persist(doc)
+        return True
+
+    async def increment_fields(self, user_id, amounts):
+        doc = self._get(user_id)
+        if doc is None:
+            return False
+        for field, amount in amounts.items():
+            *parents, name = field.split(".")
+            target = doc
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[name] = target.get(name, 0) + amount
+        self._persist(doc)
+        return True
+
+    async def init_effective_attributes(self, user_id, bonuses):
+        doc = self._get(user_id)
+        if doc is None or "equipment_bonuses" in doc:
+            return False
+        doc["effective_attributes"] = effective_attributes(
+            doc.get("attributes") or {}, sum_bonuses(bonuses.values())
+        )
+        doc["equipment_bonuses"] = copy.deepcopy(bonuses)
+        self._persist(doc)
+        return True
+
+    async def apply_equipment_bonus(self, user_id, entry_id, bonus):
+        doc = self._get(user_id)
+        if doc is None or "equipment_bonuses" not in doc or entry_id in doc["equipment_bonuses"]:
+            return False
+        effective = doc.setdefault("effective_attributes", {})
+        for attr, amount in bonus.items():
+            effective[attr] = effective.get(attr, 0) + amount
+        doc["equipment_bonuses"][entry_id] = dict(bonus)
+        self._persist(doc)
+        return True
+
+    async def remove_equipment_bonus(self, user_id, entry_id):
+        doc = self._get(user_id)
+        bonus = (doc or {}).get("equipment_bonuses", {}).pop(entry_id, None)
+        if bonus is None:
+            return False
+        effective = doc.setdefault("effective_attributes", {})
+        for attr, amount in bonus.items():
+            effective[attr] = effective.get(attr, 0) - amount
+        self._persist(doc)
+        return True
+
+    async def apply_stats(self, user_id, experience_gained, attributes_gained, projection=None):
+        doc = self._get(user_id)
+        if doc is None:
+            return None
+        total = total_experience(doc.get("level", 1), doc.get("experience", 0)) + experience_gained
+        doc["level"], doc["experience"] = level_for_total_experience(total)
+        attributes = doc.setdefault("attributes", {})
+        effective = doc.get("effective_attributes")
+        for attr, gain in attributes_gained.items():
+            if effective is not None:
+                effective[attr] = effective.get(attr, attributes.get(attr, 1)) + gain
+            attributes[attr] = attributes.get(attr, 1) + gain
+        self._persist(doc)
+        return _project(doc, projection)
+
+    async def apply_reward(self, user_id, grant_id, experience_gained, amounts, projection=None):
+        doc = self._get(user_id)
+        if doc is None or grant_id in doc.get("reward_grants", ()):
+            return None
+        total = total_experience(doc.get("level", 1), doc.get("experience", 0)) + experience_gained
+        doc["level"], doc["experience"] = level_for_total_experience(total)
+        for field, amount in amounts.items():
+            *parents, name = field.split(".")
+            target = doc
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[name] = target.get(name, 0) + amount
+        doc["reward_grants"] = (doc.get("reward_grants", []) + [grant_id])[-REWARD_GRANTS_KEPT:]
+        self._persist(doc)
+        return _project(doc, projection)
+
+    async def touch_many(self, timestamps):
+        matched = 0
+        for user_id, fields in timestamps.items():
+            doc = self._get(user_id)
+            if doc is None:
+                continue
+            matched += 1
+            changed = {f: t for f, t in fields.items() if doc.get(f) is None or doc[f] < t}
+            if changed:
+                doc.update(changed)
+                self._persist(doc)
+        return matched
+
+    async def spend_energy(self, user_id, amount, now, projection=None):
+        doc = self._get(user_id)
+        if doc is None:
+            return None
+        current, clock = regenerate(
+            doc.get("energy", 0), doc.get("max_energy", DEFAULT_MAX_ENERGY),
+            doc.get("last_energy_update"), now
+        )
+        if current < amount:
+            return None
+        doc["energy"] = current - amount
+        doc["last_energy_update"] = clock
+        self._persist(doc)
+        return _project(doc, projection)
+
+    async def refund_energy(self, user_id, amount, now, projection=None):
+        doc = self._get(user_id)
+        if doc is None:
+            return None
+        max_energy = doc.get("max_energy", DEFAULT_MAX_ENERGY)
+        current, clock = regenerate(doc.get("energy", 0), max_energy, doc.get("last_energy_update"), now)
+        doc["energy"] = min(current + amount, max_energy)
+        doc["last_energy_update"] = clock
+        self._persist(doc)
+        return _project(doc, projection)
+
+    async def iter_users(self, projection=None, batch_size=1000):
+        for doc in list(self._docs.values()):
+            yield _project(doc, projection)
+
+
+_repository: Optional[UserRepository] = None
+
+
+def get_user_repository() -> UserRepository:
+    global _repository
+    if _repository is None:
+        if STORAGE_BACKEND == "memory":
+            _repository = MemoryUserRepository()
+        else:
+            _repository = MongoUserRepository()
+    return _repository
+
+
+def set_user_repository(repository: UserRepository):
+    """Swap the backend, e.g. for benchmarks or tests"""
+    global _repository
+    _repository = repository
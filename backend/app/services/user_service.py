@@ -1,23 +1,80 @@
 # backend/app/services/user_service.py
 from datetime import datetime
-from ..services.database import get_database
-from ..auth.auth_handler import verify_password, get_password_hash, validate_password_strength
-from bson import ObjectId
+from ..services.user_repository import get_user_repository, DuplicateUserError
+from ..services.auth_cache import user_cache
+from ..services.leaderboard import leaderboard
+from ..services.activity import activity
+from ..services.metrics import span
+from ..auth.auth_handler import (
+    verify_password_async, get_password_hash_async, validate_password_strength
+)
+from ..auth.password_hasher import PasswordHasherBusy
+from ..services.energy import InsufficientEnergy, DEFAULT_MAX_ENERGY
+from ..services.leveling import effective_attributes
 from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-call-site projections; pass projection=None for the whole document
+PROFILE_PROJECTION = {
+    "username": 1, "email": 1, "full_name": 1, "user_class": 1,
+    "level": 1, "experience": 1, "created_at": 1,
+    "energy": 1, "max_energy": 1, "last_energy_update": 1
+}
+AUTH_PROJECTION = {**PROFILE_PROJECTION, "hashed_password": 1}
+STATS_PROJECTION = {
+    "username": 1, "user_class": 1, "level": 1, "experience": 1, "attributes": 1
+}
+
+DUPLICATE_USER_MESSAGES = {
+    "email": "Email already registered",
+    "username": "Username already taken",
+}
+
+# Starting attributes per class
+CLASS_BONUSES = {
+    "warrior": {"strength": 3, "vitality": 2, "agility": 1, "intelligence": 1},
+    "mage": {"intelligence": 3, "vitality": 1, "strength": 1, "agility": 1},
+    "rogue": {"agility": 3, "intelligence": 1, "strength": 1, "vitality": 1},
+    "cleric": {"vitality": 2, "intelligence": 2, "strength": 1, "agility": 1}
+}
+
 class UserServiceError(Exception):
     """Custom exception for user service errors"""
     pass
 
+def new_user_document(user_data: dict, hashed_password: str) -> dict:
+    """Storage document for a validated registration (without the password)"""
+    user_class = user_data.get("user_class", "warrior")
+    user_class = getattr(user_class, "value", user_class)
+    attributes = CLASS_BONUSES.get(user_class, CLASS_BONUSES["warrior"])
+    now = datetime.utcnow()
+    return {
+        "username": user_data["username"],
+        "email": user_data["email"].lower(),
+        "full_name": user_data["full_name"],
+        "user_class": user_class,
+        "hashed_password": hashed_password,
+        "level": 1,
+        "experience": 0,
+        "attributes": dict(attributes),
+        "effective_attributes": effective_attributes(attributes, {}),
+        "equipment_bonuses": {},
+        "energy": 100,
+        "max_energy": 100,
+        "gold": 100,  # Starting gold
+        "created_at": now,
+        "last_login": now,
+        "last_energy_update": now
+    }
+
 class UserService:
     @staticmethod
-    async def get_user_by_email(email: str) -> Optional[dict]:
+    async def get_user_by_email(email: str, projection: Optional[dict] = AUTH_PROJECTION) -> Optional[dict]:
         try:
-            db = get_database()
-            user = await db.users.find_one({"email": email.lower()})
+            with span("db"):
+                user = await get_user_repository().find_by_email(email, projection)
             if user:
                 user["id"] = str(user["_id"])
                 del user["_id"]
@@ -27,10 +84,10 @@ class UserService:
             raise UserServiceError("Database error occurred")
     
     @staticmethod
-    async def get_user_by_id(user_id: str) -> Optional[dict]:
+    async def get_user_by_id(user_id: str, projection: Optional[dict] = PROFILE_PROJECTION) -> Optional[dict]:
         try:
-            db = get_database()
-            user = await db.users.find_one({"_id": ObjectId(user_id)})
+            with span("db"):
+                user = await get_user_repository().find_by_id(user_id, projection)
             if user:
                 user["id"] = str(user["_id"])
                 del user["_id"]
@@ -43,113 +100,140 @@ class UserService:
     async def authenticate_user(email: str, password: str) -> Optional[dict]:
         try:
             user = await UserService.get_user_by_email(email)
-            if not user or not verify_password(password, user["hashed_password"]):
+            if not user or not await verify_password_async(password, user["hashed_password"]):
                 return None
             return user
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             logger.error(f"Error authenticating user: {e}")
             raise UserServiceError("Authentication error occurred")
     
     @staticmethod
-    async def create_user(user_data: dict) -> str:
+    async def create_user(user_data: dict) -> dict:
+        """Insert a new user; returns its profile (``PROFILE_PROJECTION`` fields plus ``id``)"""
         try:
             # Validate password strength
             is_valid, message = validate_password_strength(user_data.get("password", ""))
             if not is_valid:
                 raise UserServiceError(message)
             
-            db = get_database()
-            
-            # Check if user already exists (by email and username)
-            existing_email = await db.users.find_one({"email": user_data["email"].lower()})
-            if existing_email:
-                raise UserServiceError("Email already registered")
-            
-            existing_username = await db.users.find_one({"username": user_data["username"]})
-            if existing_username:
-                raise UserServiceError("Username already taken")
-            
             # Hash password and clean up data
-            user_data["hashed_password"] = get_password_hash(user_data["password"])
-            del user_data["password"]
-            user_data["email"] = user_data["email"].lower()
-            
-            # Initialize game attributes with better defaults
-            class_bonuses = {
-                "warrior": {"strength": 3, "vitality": 2, "agility": 1, "intelligence": 1},
-                "mage": {"intelligence": 3, "vitality": 1, "strength": 1, "agility": 1},
-                "rogue": {"agility": 3, "intelligence": 1, "strength": 1, "vitality": 1},
-                "cleric": {"vitality": 2, "intelligence": 2, "strength": 1, "agility": 1}
-            }
-            
-            user_class = user_data.get("user_class", "warrior")
-            attributes = class_bonuses.get(user_class, class_bonuses["warrior"])
-            
-            user_data.update({
-                "level": 1,
-                "experience": 0,
-                "attributes": attributes,
-                "energy": 100,
-                "max_energy": 100,
-                "gold": 100,  # Starting gold
-                "inventory": [],
-                "active_quests": [],
-                "completed_quests": [],
-                "exercise_logs": [],
-                "created_at": datetime.utcnow(),
-                "last_login": datetime.utcnow(),
-                "last_energy_update": datetime.utcnow()
-            })
-            
-            result = await db.users.insert_one(user_data)
-            return str(result.inserted_id)
+            hashed_password = await get_password_hash_async(user_data.pop("password"))
+            user_data.update(new_user_document(user_data, hashed_password))
+            
+            # Unique indexes on email and username reject duplicates in the same round-trip
+            with span("db"):
+                user_id = await get_user_repository().insert(user_data)
+            user_cache.invalidate(email=user_data["email"])
+            leaderboard.update_user({**user_data, "id": user_id})
+            user = {field: user_data[field] for field in PROFILE_PROJECTION if field in user_data}
+            user["id"] = user_id
+            return user
             
-        except UserServiceError:
+        except DuplicateUserError as e:
+            raise UserServiceError(DUPLICATE_USER_MESSAGES.get(e.field, DUPLICATE_USER_MESSAGES["email"]))
+        except (UserServiceError, PasswordHasherBusy):
             raise
         except Exception as e:
             logger.error(f"Error creating user: {e}")
             logger.error(f"User data: {user_data}")
             raise UserServiceError(f"User creation failed: {str(e)}")
 
+    @staticmethod
+    async def apply_stats(user_id: str, experience_gained: int, attributes_gained: dict) -> Optional[dict]:
+        """Atomically grant experience and attributes; returns the updated user"""
+        with span("db"):
+            user = await get_user_repository().apply_stats(
+                user_id, experience_gained, attributes_gained, STATS_PROJECTION
+            )
+        user_cache.invalidate(user_id=user_id)
+        activity.touch(user_id, "last_activity")
+        if user:
+            user["id"] = str(user["_id"])
+            del user["_id"]
+            leaderboard.update_user(user)
+        return user
+
     @staticmethod
     async def update_user_stats(user_id: str, experience_gained: int, attributes_gained: dict) -> bool:
         """Update user experience and attributes"""
         try:
-            db = get_database()
-            
-            # Calculate level progression
-            user = await UserService.get_user_by_id(user_id)
-            if not user:
-                return False
-            
-            new_experience = user["experience"] + experience_gained
-            new_level = user["level"]
-            
-            # Simple level calculation: 100 XP per level with scaling
-            while new_experience >= (new_level * 100):
-                new_experience -= (new_level * 100)
-                new_level += 1
-            
-            # Update attributes
-            current_attributes = user.get("attributes", {})
-            for attr, gain in attributes_gained.items():
-                current_attributes[attr] = current_attributes.get(attr, 1) + gain
-            
-            # Update user
-            update_result = await db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {
-                    "$set": {
-                        "level": new_level,
-                        "experience": new_experience,
-                        "attributes": current_attributes,
-                        "last_activity": datetime.utcnow()
-                    }
-                }
-            )
-            
-            return update_result.modified_count > 0
+            user = await UserService.apply_stats(user_id, experience_gained, attributes_gained)
+            return user is not None
             
         except Exception as e:
             logger.error(f"Error updating user stats: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    async def grant_rewards(user_id: str, rewards: dict, grant_id: str) -> bool:
+        """Grant a reward bundle such as ``{"exp": 100, "gold": 50}``.
+
+        Idempotent per ``grant_id``: repeating a grant the user already
+        received changes nothing and still returns True.
+        """
+        experience = rewards.get("exp", 0)
+        other = {field: amount for field, amount in rewards.items() if field != "exp" and amount}
+        with span("db"):
+            user = await get_user_repository().apply_reward(
+                user_id, grant_id, experience, other, STATS_PROJECTION
+            )
+        user_cache.invalidate(user_id=user_id)
+        if user is None:
+            # Either granted before or the user is gone
+            return await get_user_repository().find_by_id(user_id, {"_id": 1}) is not None
+        user["id"] = str(user.pop("_id"))
+        leaderboard.update_user(user)
+        return True
+
+    @staticmethod
+    def record_login(user_id: str):
+        """Stamp last_login for the user; written in the background"""
+        activity.touch(user_id, "last_login")
+
+    @staticmethod
+    async def spend_energy(user_id: str, amount: int) -> dict:
+        """Atomically regenerate and spend ``amount`` energy.
+
+        The regenerated balance is re-checked inside the atomic update, so
+        two concurrent spends can never take the user below zero.
+        """
+        if amount <= 0:
+            raise ValueError("Energy amount must be positive")
+        
+        with span("db"):
+            user = await get_user_repository().spend_energy(
+                user_id, amount, datetime.utcnow(),
+                {"energy": 1, "max_energy": 1, "last_energy_update": 1}
+            )
+        if user is None:
+            raise InsufficientEnergy("Not enough energy")
+        
+        user_cache.invalidate(user_id=user_id)
+        return {
+            "energy": user["energy"],
+            "max_energy": user.get("max_energy", DEFAULT_MAX_ENERGY),
+            "last_energy_update": user["last_energy_update"]
+        }
+
+    @staticmethod
+    async def refund_energy(user_id: str, amount: int) -> Optional[dict]:
+        """Give back ``amount`` spent energy, never above ``max_energy``; None if the user is gone"""
+        if amount <= 0:
+            raise ValueError("Energy amount must be positive")
+
+        with span("db"):
+            user = await get_user_repository().refund_energy(
+                user_id, amount, datetime.utcnow(),
+                {"energy": 1, "max_energy": 1, "last_energy_update": 1}
+            )
+        if user is None:
+            return None
+
+        user_cache.invalidate(user_id=user_id)
+        return {
+            "energy": user["energy"],
+            "max_energy": user.get("max_energy", DEFAULT_MAX_ENERGY),
+            "last_energy_update": user["last_energy_update"]
+        }
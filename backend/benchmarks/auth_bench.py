@@ -0,0 +1,280 @@
+# benchmarks/auth_bench.py - load and latency benchmark for the auth API
+"""Drive the auth endpoints at a fixed concurrency and report latency.
+
+By default the app runs in-process against an in-memory MongoDB stand-in
+(mongomock-motor), so no services are needed:
+
+    python benchmarks/auth_bench.py --requests 2000 --concurrency 50 --output results.json
+
+Other targets:
+    --server uvicorn          serve the app over real HTTP on a local port
+    --mongo-url URL           use a real (local) MongoDB instead of the stand-in
+    --url http://host:8000    benchmark an already running server
+    --user-storage memory     keep users in the embedded in-process store
+
+Compare against a stored run; exits with status 1 on regression:
+    python benchmarks/auth_bench.py --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "BenchPassword123"
+SCENARIOS = ("health", "register", "login", "me", "refresh")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(name, latencies, errors, elapsed):
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "scenario": name,
+        "requests": count + errors,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def run_scenario(name, make_request, total, concurrency):
+    """Issue ``total`` requests from ``concurrency`` workers"""
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(i)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - started)
+
+
+async def seed_users(client, count, run_id):
+    """Register users for login/me/refresh; returns (emails, tokens)"""
+    emails, tokens = [], []
+    for i in range(count):
+        email = f"seed-{run_id}-{i}@example.com"
+        response = await client.post("/api/auth/register", json={
+            "username": f"seed_{run_id}_{i}",
+            "email": email,
+            "full_name": "Bench User",
+            "user_class": "warrior",
+            "password": PASSWORD,
+        })
+        response.raise_for_status()
+        emails.append(email)
+        tokens.append(response.json())
+    return emails, tokens
+
+
+async def benchmark(client, args):
+    run_id = uuid.uuid4().hex[:8]
+    emails, tokens = await seed_users(client, args.users, run_id)
+
+    # Refresh tokens are single use: each request takes one from the pool and
+    # puts back the rotated token, so concurrency is capped at the pool size
+    refresh_pool = [t["refresh_token"] for t in tokens]
+
+    async def refresh(i):
+        response = await client.post("/api/auth/refresh", json={"refresh_token": refresh_pool.pop()})
+        if response.status_code == 200:
+            refresh_pool.append(response.json()["refresh_token"])
+        return response
+
+    requests = {
+        "health": lambda i: client.get("/api/health"),
+        "register": lambda i: client.post("/api/auth/register", json={
+            "username": f"bench_{run_id}_{i}",
+            "email": f"bench-{run_id}-{i}@example.com",
+            "full_name": "Bench User",
+            "user_class": "mage",
+            "password": PASSWORD,
+        }),
+        "login": lambda i: client.post("/api/auth/login", json={
+            "email": emails[i % len(emails)], "password": PASSWORD
+        }),
+        "me": lambda i: client.get("/api/auth/me", headers={
+            "Authorization": f"Bearer {tokens[i % len(tokens)]['access_token']}"
+        }),
+        "refresh": refresh,
+    }
+
+    results = []
+    for name in args.scenarios:
+        total = args.requests
+        if name in ("register", "login"):
+            total = max(1, int(args.requests * args.hash_fraction))
+        concurrency = min(args.concurrency, len(refresh_pool)) if name == "refresh" else args.concurrency
+        result = await run_scenario(name, requests[name], total, concurrency)
+        results.append(result)
+        print(f"  {name:<9} {result['throughput_rps']:>9.1f} req/s  "
+              f"p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+              f"p99 {result['p99_ms']:>8.2f}ms  errors {result['errors']}")
+    return results
+
+
+def configure_app(args):
+    """Import the app configured for benchmarking and point it at the database"""
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    if args.mongo_url:
+        os.environ["MONGODB_URL"] = args.mongo_url
+        os.environ["DATABASE_NAME"] = args.database
+
+    from app.main import app
+    from app.services import database
+    from app.services.rate_limiter import rate_limiter, RateLimitPolicy
+
+    if args.user_storage == "memory":
+        from app.services.user_repository import MemoryUserRepository, set_user_repository
+        set_user_repository(MemoryUserRepository(log_path=None))
+
+    # The benchmark is one client IP; lift the per-IP limits
+    for name in list(rate_limiter.policies):
+        rate_limiter.policies[name] = RateLimitPolicy(name, 10 ** 9, 1)
+
+    if not args.mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+
+        def open_stand_in():
+            database.mongodb.client = AsyncMongoMockClient()
+            database.mongodb.database = database.mongodb.client[args.database]
+
+        database.open_mongo_client = open_stand_in
+        import app.main as main_module
+        main_module.open_mongo_client = open_stand_in
+    return app
+
+
+async def run(args):
+    import httpx
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await benchmark(client, args)
+
+    app = configure_app(args)
+    if args.server == "uvicorn":
+        import uvicorn
+        config = uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+        server = uvicorn.Server(config)
+        serve_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}",
+                                         limits=limits, timeout=60) as client:
+                return await benchmark(client, args)
+        finally:
+            server.should_exit = True
+            await serve_task
+
+    from app.main import app as asgi_app, startup_event, shutdown_event
+    await startup_event()
+    await asgi_app.state.init_task
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await benchmark(client, args)
+    finally:
+        await shutdown_event()
+
+
+def compare(results, baseline, tolerance):
+    """Return human readable regressions against a baseline run"""
+    previous = {r["scenario"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = previous.get(result["scenario"])
+        if not base:
+            continue
+        if base["throughput_rps"] and result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{result['scenario']}: throughput {result['throughput_rps']} < {base['throughput_rps']} req/s"
+            )
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{result['scenario']}: {key} {result[key]} > {base[key]}")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{result['scenario']}: errors {result['errors']} > {base['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth API load and latency benchmark")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=20, help="users seeded for login/me/refresh")
+    parser.add_argument("--hash-fraction", type=float, default=0.1,
+                        help="fraction of --requests used for bcrypt-bound scenarios")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="benchmark an already running server instead")
+    parser.add_argument("--mongo-url", help="real MongoDB to use instead of the in-memory stand-in")
+    parser.add_argument("--database", default="singularity_bench")
+    parser.add_argument("--user-storage", choices=("mongo", "memory"), default="mongo",
+                        help="user repository backend to benchmark")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    target = args.url or f"{args.server} app, {'MongoDB at ' + args.mongo_url if args.mongo_url else 'in-memory MongoDB'}"
+    print(f"🏋️  Benchmarking {target} ({args.requests} requests, concurrency {args.concurrency})")
+    results = asyncio.run(run(args))
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
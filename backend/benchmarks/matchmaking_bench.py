@@ -0,0 +1,142 @@
+# benchmarks/matchmaking_bench.py - synthetic load for duel matchmaking
+"""Simulate thousands of players waiting for duels at once.
+
+Players arrive at ``--rate`` per second (Poisson), with a random class and
+a level drawn from a long-tailed distribution, join the in-process
+matchmaker and long-poll until they are matched. A ``--give-up`` fraction
+leave the queue after waiting ``--patience`` seconds. Reports time to
+match, level gaps, peak queue length and tick cost:
+
+    python benchmarks/matchmaking_bench.py --players 20000 --rate 2000 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.user import UserClass
+from app.services.matchmaking import Matchmaker
+
+CLASSES = [c.value for c in UserClass]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def player(matchmaker, index, args, rng, results):
+    user = {
+        "id": f"player-{index}",
+        "username": f"player{index}",
+        "user_class": rng.choice(CLASSES),
+        "level": min(100, 1 + int(rng.expovariate(1 / 15))),
+    }
+    matchmaker.enqueue(user)
+    started = time.monotonic()
+    patience = args.patience if rng.random() < args.give_up else None
+    while True:
+        timeout = args.poll_timeout
+        if patience is not None:
+            timeout = min(timeout, max(0.0, started + patience - time.monotonic()))
+        match = await matchmaker.wait(user["id"], timeout)
+        if match is not None:
+            opponent = next(p for p in match["players"] if p["user_id"] != user["id"])
+            results["waits"].append(time.monotonic() - started)
+            results["gaps"].append(abs(opponent["level"] - user["level"]))
+            return
+        if patience is not None and time.monotonic() - started >= patience:
+            matchmaker.cancel(user["id"])
+            results["gave_up"] += 1
+            return
+
+
+async def sample_queue(matchmaker, results, stop):
+    while not stop.is_set():
+        results["peak_queued"] = max(results["peak_queued"], matchmaker.stats()["queued"])
+        results["max_tick_ms"] = max(results["max_tick_ms"], matchmaker.last_tick_ms)
+        await asyncio.sleep(0.05)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    matchmaker = Matchmaker(tick_interval=args.tick_interval, band_size=args.band_size,
+                            widen_seconds=args.widen_seconds, max_widen=args.max_widen)
+    results = {"waits": [], "gaps": [], "gave_up": 0, "peak_queued": 0, "max_tick_ms": 0.0}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_queue(matchmaker, results, stop))
+    matchmaker.start()
+
+    started = time.perf_counter()
+    players, arrival = [], started
+    for index in range(args.players):
+        players.append(asyncio.create_task(player(matchmaker, index, args, rng, results)))
+        arrival += rng.expovariate(args.rate)
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    # Whoever is still alone at the end leaves after its patience or the drain timeout
+    done, pending = await asyncio.wait(players, timeout=args.drain_timeout)
+    for task in pending:
+        task.cancel()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await sampler
+    stats = matchmaker.stats()
+    await matchmaker.stop()
+
+    waits, gaps = sorted(results["waits"]), sorted(results["gaps"])
+    return {
+        "players": args.players,
+        "matched_players": len(waits),
+        "gave_up": results["gave_up"],
+        "unmatched": len(pending),
+        "elapsed_s": round(elapsed, 2),
+        "matches": stats["matches"],
+        "widened_matches": stats["widened_matches"],
+        "ticks": stats["ticks"],
+        "peak_queued": results["peak_queued"],
+        "max_tick_ms": round(results["max_tick_ms"], 3),
+        "wait_p50_s": round(percentile(waits, 50), 3),
+        "wait_p95_s": round(percentile(waits, 95), 3),
+        "wait_p99_s": round(percentile(waits, 99), 3),
+        "level_gap_p50": percentile(gaps, 50),
+        "level_gap_p95": percentile(gaps, 95),
+        "level_gap_max": gaps[-1] if gaps else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic load for duel matchmaking")
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=1000, help="arrivals per second")
+    parser.add_argument("--tick-interval", type=float, default=0.5)
+    parser.add_argument("--band-size", type=int, default=5)
+    parser.add_argument("--widen-seconds", type=float, default=2.0)
+    parser.add_argument("--max-widen", type=int, default=3)
+    parser.add_argument("--poll-timeout", type=float, default=25.0)
+    parser.add_argument("--give-up", type=float, default=0.1, help="fraction of impatient players")
+    parser.add_argument("--patience", type=float, default=5.0)
+    parser.add_argument("--drain-timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for key, value in results.items():
+        print(f"{key:>18}: {value}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/serialization_bench.py - auth response serialization micro-benchmark
+"""Compare how auth responses are turned into bytes.
+
+"before" is what FastAPI did for ``login``/``register`` and ``/me``:
+validate the document into ``UserResponse``, run the result through
+``jsonable_encoder`` and render it with the stdlib ``JSONResponse``.
+"after" is the path the routes use now: ``model_construct`` plus a
+precompiled TypeAdapter, and ``FastJSONResponse`` for plain dicts.
+
+    python benchmarks/serialization_bench.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime
+
+from bson import ObjectId
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.user import UserResponse
+from app.services.serialization import (
+    FastJSONResponse, token_response, json_response, user_response, user_response_adapter
+)
+
+USER = {
+    "_id": ObjectId(),
+    "id": str(ObjectId()),
+    "username": "bench_user",
+    "email": "bench@example.com",
+    "full_name": "Bench User",
+    "user_class": "warrior",
+    "level": 12,
+    "experience": 340,
+    "energy": 87,
+    "max_energy": 100,
+    "last_energy_update": datetime.utcnow(),
+    "created_at": datetime.utcnow(),
+}
+ACCESS_TOKEN = "a" * 160
+REFRESH_TOKEN = "r" * 160
+
+
+def token_before():
+    content = {
+        "access_token": ACCESS_TOKEN,
+        "refresh_token": REFRESH_TOKEN,
+        "token_type": "bearer",
+        "user": UserResponse(**USER),
+    }
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def token_after():
+    return token_response(ACCESS_TOKEN, REFRESH_TOKEN, USER).body
+
+
+def me_before():
+    return JSONResponse(jsonable_encoder(UserResponse(**USER))).body
+
+
+def me_after():
+    return json_response(user_response_adapter, user_response(USER)).body
+
+
+def dict_before():
+    return JSONResponse(jsonable_encoder({"user": {**USER, "_id": str(USER["_id"])}})).body
+
+
+def dict_after():
+    return FastJSONResponse({"user": USER}).body
+
+
+CASES = {
+    "token envelope": (token_before, token_after),
+    "/me profile": (me_before, me_after),
+    "plain dict": (dict_before, dict_after),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth response serialization micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"🏋️  {args.iterations} iterations, best of {args.repeat}")
+    for name, (before, after) in CASES.items():
+        timings = []
+        for fn in (before, after):
+            best = min(timeit.repeat(fn, number=args.iterations, repeat=args.repeat))
+            timings.append(best / args.iterations * 1e6)
+        print(f"  {name:<15} before {timings[0]:>7.2f}µs  after {timings[1]:>7.2f}µs  "
+              f"speedup {timings[0] / timings[1]:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
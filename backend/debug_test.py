@@ -27,11 +27,11 @@ async def test_user_creation():
         print(f"📝 Creating user: {test_user['username']}")
         
         # Try to create user
-        user_id = await UserService.create_user(test_user)
-        print(f"✅ User created successfully with ID: {user_id}")
+        user = await UserService.create_user(test_user)
+        print(f"✅ User created successfully with ID: {user['id']}")
         
         # Fetch the created user
-        user = await UserService.get_user_by_id(user_id)
+        user = await UserService.get_user_by_id(user["id"])
         print(f"✅ User fetched: {user['username']} - {user['email']}")
         
         return True
@@ -1,11 +1,29 @@
+import argparse
+import os
 import uvicorn
-from app.main import app
+from dotenv import load_dotenv
+
+load_dotenv()
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Singularity API")
+    parser.add_argument(
+        "--mode",
+        choices=("development", "production"),
+        default=os.getenv("SERVER_MODE", "development"),
+        help="development: single process with auto-reload; production: prefork workers"
+    )
+    parser.add_argument("--workers", type=int, help="production worker count (WEB_CONCURRENCY)")
+    args = parser.parse_args()
+
+    if args.mode == "production":
+        from app.server import serve_production, WEB_CONCURRENCY
+        serve_production(args.workers or WEB_CONCURRENCY)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True,
+            log_level="info"
+        )
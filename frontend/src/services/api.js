@@ -27,8 +27,9 @@ api.interceptors.request.use(
           refresh_token: tokenManager.getRefreshToken(),
         });
 
-        const { access_token } = response.data;
-        tokenManager.setTokens(access_token, tokenManager.getRefreshToken());
+        // Refresh tokens are single use; keep the rotated one
+        const { access_token, refresh_token } = response.data;
+        tokenManager.setTokens(access_token, refresh_token);
         config.headers.Authorization = `Bearer ${access_token}`;
       } catch (error) {
         // Refresh failed, redirect to login
@@ -61,6 +62,8 @@ export const authAPI = {
   register: (userData) => api.post("/auth/register", userData),
   refresh: (refreshToken) =>
     api.post("/auth/refresh", { refresh_token: refreshToken }),
+  logout: (refreshToken) =>
+    api.post("/auth/logout", { refresh_token: refreshToken }),
   me: () => api.get("/auth/me"),
 };
 